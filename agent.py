@@ -1,96 +1,304 @@
-"""from queue import PriorityQueue
+"""
+Grid pathfinding
+
+GridMap discretizes the walkable part of the world into square cells and
+PathFinder runs A* over it so agents can route to food around obstacles.
+Cells are addressed by flat index (x + y * cols) throughout.
+"""
+from collections import OrderedDict
+import heapq
+
 import numpy as np
-class AStarPoint():
-    def __init__(self,point, parent=None):
-        self.x = int(point[0])
-        self.y = int(point[1])
-        self.parent = None
-        self.f = -1
-        self.g = -1
-        self.h = -1
-
-    def __str__(self):
-        return f"({self.x}, {self.y})"
-
-class Graph():
-    def __init__(self):
-        self.visited = set()
-    
-    def neighbors(self, current, max_x, max_y):
-        u,v = current
-        if current in self.visited:
-            return []
-        else:
-            self.visited.add(current)
-        rets=[]
-        for x in range(3):
-            for y in range(3):
-                m = u+x-1
-                n = v+y-1
-                if 0 <= m <= max_x and 0 <= n <= max_y:
-                    rets.append((m, n))
-                    
-                    
-        return rets
-
-    
-    def cost(self,a,b):
-        x1, y1 = a
-        x2, y2 = b
-        return abs(x1-x2) + abs(y1-y2)
-
-
-class AStarAgent():
-    def __init__(self, goals, root):
-        self.goals = goals
-        self.root = root
-        self.open_list = set()
-        self.closed_list = {}
-        self.curr_goal_index = np.argmin([self.heuristic(goal, self.root)
-                                         for goal in self.goals])
-        self.curr_goal = self.goals[self.curr_goal_index]
-        self.graph = Graph()
-
-
-
-
-    def heuristic(self,a, b):
-        (x1, y1) = a
-        (x2, y2) = b
-        return abs(x1 - x2)+ abs(y1 - y2)
-
-    def a_star_search(self, max_x, max_y):
-        frontier = PriorityQueue()
-        frontier.put(self.root, 0)
-        came_from = {}
-        cost_so_far = {}
-        came_from[self.root] = None
-        cost_so_far[self.root] = 0
-        
-        while not frontier.empty():
-            current = frontier.get()
-            
-            if current == self.curr_goal:
-                break
-            
-            for next in self.graph.neighbors(current, max_x, max_y):
-                new_cost = cost_so_far[current] + self.graph.cost(current, next)
-                if next not in cost_so_far or new_cost < cost_so_far[next]:
-                    cost_so_far[next] = new_cost
-                    priority = new_cost + self.heuristic(self.curr_goal, next)
-                    frontier.put(next, priority)
-                    came_from[next] = current
-        
-        #unravel the path
-        current = self.curr_goal
-        path =[]
-        print(f"from :{self.root} to {self.curr_goal} ")
-        #print(came_from)
-        while current != self.root:
-            #print(current)
-            path.insert(0,current)
-            current = came_from[current]
-        
-        return path, came_from, cost_so_far
-    
-"""
\ No newline at end of file
+
+SQRT2 = np.sqrt(2)
+
+# Neighbor offsets (dx, dy) and the cost of each step
+STEPS = [(1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+         (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2)]
+
+
+class GridMap():
+    def __init__(self, lower, upper, cell_size, blocked=None):
+        """
+        Grid over the rectangle from lower to upper.  blocked, if given, is
+        called as blocked(centers, half_size) and returns a mask of the cells
+        agents cannot enter, e.g. Physics.blocked.
+        """
+        self.origin = np.asarray(lower, dtype=float)
+        self.cell_size = float(cell_size)
+        size = np.asarray(upper, dtype=float) - self.origin
+        self.cols = max(int(size[0] // self.cell_size), 1)
+        self.rows = max(int(size[1] // self.cell_size), 1)
+
+        self.blocked = np.zeros(self.cols * self.rows, dtype=bool)
+        if blocked is not None:
+            centers = self.centers(np.arange(len(self.blocked)))
+            self.blocked[:] = blocked(centers, self.cell_size / 2)
+
+    def __len__(self):
+        return self.cols * self.rows
+
+    def cells(self, positions):
+        """
+        Flat indices of the cells containing positions.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        ij = np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+        ij[:, 0] = np.clip(ij[:, 0], 0, self.cols - 1)
+        ij[:, 1] = np.clip(ij[:, 1], 0, self.rows - 1)
+        return ij[:, 0] + ij[:, 1] * self.cols
+
+    def cell(self, position):
+        return int(self.cells(position)[0])
+
+    def centers(self, cells):
+        cells = np.asarray(cells)
+        return self.origin + self.cell_size * (np.column_stack([cells % self.cols, cells // self.cols]) + 0.5)
+
+    def neighbors(self, cell):
+        """
+        Walkable neighbors of a cell with their step costs.  Diagonal steps
+        may not cut the corner of a blocked cell.
+        """
+        x = cell % self.cols
+        y = cell // self.cols
+        blocked = self.blocked
+        cols = self.cols
+        out = []
+        for dx, dy, cost in STEPS:
+            nx = x + dx
+            ny = y + dy
+            if not (0 <= nx < cols and 0 <= ny < self.rows):
+                continue
+            n = nx + ny * cols
+            if blocked[n]:
+                continue
+            if dx and dy and (blocked[nx + y * cols] or blocked[x + ny * cols]):
+                continue
+            out.append((n, cost))
+        return out
+
+
+def octile(dx, dy):
+    """
+    Exact path length on an 8-connected grid without obstacles.
+    """
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+
+class PathFinder():
+    """
+    A* search over a GridMap.
+
+    The cost, parent and visit-stamp buffers are allocated once and reused
+    by every query; a query only touches the cells it expands.  Paths are
+    cached by (start cell, goal cell) in a bounded LRU.
+    """
+    def __init__(self, grid, cache_size=4096):
+        self.grid = grid
+        self.cost = np.zeros(len(grid))
+        self.parent = np.zeros(len(grid), dtype=np.int64)
+        # A cell's cost and parent are valid only when its stamp matches the
+        # current query, so buffers never need clearing between queries
+        self.stamp = np.zeros(len(grid), dtype=np.int64)
+        self.closed = np.zeros(len(grid), dtype=np.int64)
+        self.query = 0
+
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def clear_cache(self):
+        """
+        Forget cached paths, e.g. after the grid's blocked cells change.
+        """
+        self.cache.clear()
+
+    def search(self, start, goal):
+        """
+        Cells of a shortest path from start to goal, both included, or None
+        if goal cannot be reached.
+        """
+        key = (start, goal)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+
+        # Unreachable goals are cached too, as None
+        path = self._search(start, goal)
+        self.cache[key] = path
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return path
+
+    def _search(self, start, goal):
+        grid = self.grid
+        if grid.blocked[goal]:
+            return None
+
+        self.query += 1
+        query = self.query
+        cost = self.cost
+        parent = self.parent
+        stamp = self.stamp
+        closed = self.closed
+        cols = grid.cols
+        gx = goal % cols
+        gy = goal // cols
+
+        cost[start] = 0.0
+        parent[start] = -1
+        stamp[start] = query
+        frontier = [(octile(abs(start % cols - gx), abs(start // cols - gy)), start)]
+
+        while frontier:
+            _, current = heapq.heappop(frontier)
+            if closed[current] == query:
+                # Stale entry left behind by a cheaper re-insert
+                continue
+            closed[current] = query
+
+            if current == goal:
+                path = [goal]
+                while parent[path[-1]] != -1:
+                    path.append(int(parent[path[-1]]))
+                path.reverse()
+                return path
+
+            base = cost[current]
+            for n, step in grid.neighbors(current):
+                if closed[n] == query:
+                    continue
+                new_cost = base + step
+                if stamp[n] != query or new_cost < cost[n]:
+                    stamp[n] = query
+                    cost[n] = new_cost
+                    parent[n] = current
+                    h = octile(abs(n % cols - gx), abs(n // cols - gy))
+                    heapq.heappush(frontier, (new_cost + h, n))
+
+        return None
+
+    def find_path(self, start, goal):
+        """
+        World-space waypoints from position start to position goal: the
+        centers of the cells along the path, ending at goal itself.
+        """
+        cells = self.search(self.grid.cell(start), self.grid.cell(goal))
+        if cells is None:
+            return None
+        waypoints = self.grid.centers(cells[1:])
+        if len(waypoints) == 0:
+            return np.asarray(goal, dtype=float).reshape(1, 2)
+        waypoints[-1] = goal
+        return waypoints
+
+
+class FlowField():
+    """
+    Distance from every cell to its nearest food, for all agents at once.
+
+    A multi-source Dijkstra from the food cells fills the whole grid; an
+    agent anywhere then steps towards the neighboring cell closest to food
+    in O(1).  Adding food only lowers distances and relaxes outward from the
+    new cells; removing food re-seeds just the region whose nearest food
+    was removed from the cells bordering it.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.dist = np.full(len(grid), np.inf)
+        # Cell holding the food each cell's distance leads to
+        self.source = np.full(len(grid), -1, dtype=np.int64)
+        # Food items per cell; a cell stops being a source when it reaches 0
+        self.count = np.zeros(len(grid), dtype=np.int64)
+
+    def _relax(self, frontier):
+        """
+        Dijkstra from the (dist, cell) entries of frontier, only ever
+        lowering distances.
+        """
+        dist = self.dist
+        source = self.source
+        neighbors = self.grid.neighbors
+        heapq.heapify(frontier)
+        while frontier:
+            d, current = heapq.heappop(frontier)
+            if d > dist[current]:
+                continue
+            origin = source[current]
+            for n, step in neighbors(current):
+                nd = d + step
+                if nd < dist[n]:
+                    dist[n] = nd
+                    source[n] = origin
+                    heapq.heappush(frontier, (nd, n))
+
+    def add_food(self, positions):
+        cells = self.grid.cells(positions)
+        np.add.at(self.count, cells, 1)
+        frontier = []
+        for cell in np.unique(cells).tolist():
+            if self.dist[cell] > 0:
+                self.dist[cell] = 0.0
+                self.source[cell] = cell
+                frontier.append((0.0, cell))
+        self._relax(frontier)
+
+    def remove_food(self, positions):
+        cells = self.grid.cells(positions)
+        np.subtract.at(self.count, cells, 1)
+        emptied = np.unique(cells[self.count[cells] == 0])
+        if len(emptied) == 0:
+            return
+
+        # Forget every distance that led to an emptied cell
+        region = np.isin(self.source, emptied)
+        self.dist[region] = np.inf
+        self.source[region] = -1
+
+        # and recompute them from the cells bordering that region.  The border
+        # is walked over STEPS rather than grid.neighbors: food in a blocked
+        # cell is still a source that _relax expands from, so blocked cells
+        # with a finite distance have to seed the region too
+        grid = self.grid
+        cells = np.flatnonzero(region)
+        x = cells % grid.cols
+        y = cells // grid.cols
+        border = []
+        for dx, dy, _ in STEPS:
+            nx = x + dx
+            ny = y + dy
+            inside = (nx >= 0) & (nx < grid.cols) & (ny >= 0) & (ny < grid.rows)
+            border.append(nx[inside] + ny[inside] * grid.cols)
+        border = np.unique(np.concatenate(border))
+        border = border[~region[border] & np.isfinite(self.dist[border])]
+        self._relax(list(zip(self.dist[border].tolist(), border.tolist())))
+
+    def directions(self, positions):
+        """
+        Unit vectors from positions towards the neighboring cell closest to
+        food.  Zero for agents already in a food cell or cut off from food.
+        """
+        grid = self.grid
+        cells = grid.cells(positions)
+        x = cells % grid.cols
+        y = cells // grid.cols
+
+        padded = np.full((grid.rows + 2, grid.cols + 2), np.inf)
+        padded[1:-1, 1:-1] = self.dist.reshape(grid.rows, grid.cols)
+
+        best = self.dist[cells].copy()
+        step = np.zeros((len(cells), 2))
+        for dx, dy, _ in STEPS:
+            d = padded[y + 1 + dy, x + 1 + dx]
+            better = d < best
+            best[better] = d[better]
+            step[better] = (dx, dy)
+
+        targets = grid.origin + grid.cell_size * (np.column_stack([x, y]) + step + 0.5)
+        offsets = np.where(np.any(step != 0, axis=1)[:, None], targets - positions, 0.0)
+        norm = np.linalg.norm(offsets, axis=1, keepdims=True)
+        return np.divide(offsets, norm, out=np.zeros_like(offsets), where=norm > 0)
@@ -0,0 +1,60 @@
+"""
+Animation update cost versus population
+
+Compares advancing every agent sprite's animation on every tick (the eager
+per-tick update_animation pass GameView used to run) with animating only
+the sprites in view, once per drawn frame, from the world tick.
+
+    python benchmarks/bench_animation.py [--counts 100 1000 10000] [--visible 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import PlayerCharacter  # noqa: E402
+from world import World  # noqa: E402
+
+TICKS = 120
+# Simulation ticks per drawn frame, e.g. a 60 Hz sim drawn at 30 FPS
+TICKS_PER_FRAME = 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--visible", type=int, default=200, help="sprites in view")
+    args = parser.parse_args()
+
+    print(f"{'agents':>8} {'eager ms/tick':>14} {'lazy ms/tick':>13}")
+    for count in args.counts:
+        world = World(player_count=count, coin_count=50, seed=0)
+        world.setup()
+        # Give everyone a walking velocity so the walk cycle is exercised
+        world.agents.velocities[:] = np.random.default_rng(0).normal(size=(count, 2))
+        sprites = [PlayerCharacter(world.agents, i) for i in range(count)]
+        in_view = sprites[:args.visible]
+
+        start = time.perf_counter()
+        for tick in range(TICKS):
+            for sprite in sprites:
+                sprite.sync()
+                sprite.animate(tick)
+        eager = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for tick in range(0, TICKS, TICKS_PER_FRAME):
+            for sprite in in_view:
+                sprite.sync()
+                sprite.animate(tick)
+        lazy = time.perf_counter() - start
+
+        print(f"{count:>8} {1000 * eager / TICKS:>14.3f} {1000 * lazy / TICKS:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
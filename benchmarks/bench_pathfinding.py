@@ -0,0 +1,66 @@
+"""
+Pathfinding queries per second
+
+Runs random A* queries on a 6144x3456 world at several grid resolutions,
+with random rectangular obstacles so paths have to route around them.
+Each resolution is timed once with a cold path cache (every query a fresh
+search) and once replaying the same queries against the warm cache.
+
+    python benchmarks/bench_pathfinding.py [--queries 200] [--cells 16 32 64 128]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import GridMap, PathFinder  # noqa: E402
+from world import WORLD_WIDTH, WORLD_HEIGHT  # noqa: E402
+
+
+def random_obstacles(rng, count, max_size=600):
+    lower = rng.uniform((0, 0), (WORLD_WIDTH, WORLD_HEIGHT), size=(count, 2))
+    upper = lower + rng.uniform(64, max_size, size=(count, 2))
+    return lower, upper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--obstacles", type=int, default=40)
+    parser.add_argument("--cells", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lower, upper = random_obstacles(rng, args.obstacles)
+
+    def blocked(centers, half):
+        overlap = (centers[:, None, :] + half > lower) & (centers[:, None, :] - half < upper)
+        return np.any(np.all(overlap, axis=2), axis=1)
+
+    print(f"{'cell':>6} {'grid':>11} {'found':>6} {'cold q/s':>10} {'warm q/s':>10}")
+    for cell_size in args.cells:
+        grid = GridMap((0, 0), (WORLD_WIDTH, WORLD_HEIGHT), cell_size, blocked=blocked)
+        free = np.flatnonzero(~grid.blocked)
+        pairs = rng.choice(free, size=(args.queries, 2))
+        finder = PathFinder(grid, cache_size=2 * args.queries)
+
+        start = time.perf_counter()
+        found = sum(finder.search(int(a), int(b)) is not None for a, b in pairs)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for a, b in pairs:
+            finder.search(int(a), int(b))
+        warm = time.perf_counter() - start
+
+        print(f"{cell_size:>6} {f'{grid.cols}x{grid.rows}':>11} {found:>6} "
+              f"{args.queries / cold:>10.1f} {args.queries / warm:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup time as a function of agent count
+
+Times World.setup plus building the sprites GameView draws for increasing
+populations, cold (every texture read from disk again) and warm (textures
+shared between sprites) and, with --atlas, with textures cut from the
+packed atlas.
+
+    python benchmarks/bench_startup.py [--atlas] [--counts 4 64 1024 4096]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arcade  # noqa: E402
+
+import textures  # noqa: E402
+from game import PlayerCharacter  # noqa: E402
+from world import World  # noqa: E402
+
+
+def clear_caches():
+    """
+    Forget every loaded texture, both the registry's and the cache arcade
+    keeps inside load_texture, so the next startup reads images again.
+    """
+    textures.clear()
+    cache = getattr(arcade.load_texture, "texture_cache", None)
+    if cache is not None:
+        cache.clear()
+
+
+def startup(player_count, coin_count):
+    world = World(player_count=player_count, coin_count=coin_count)
+    world.setup()
+    players = arcade.SpriteList()
+    for i in range(player_count):
+        players.append(PlayerCharacter(world.agents, i))
+    coins = arcade.SpriteList()
+    apple = textures.food_textures("apple")
+    for _ in range(coin_count):
+        coin = arcade.Sprite()
+        coin.textures = apple
+        coin.texture = apple[0]
+        coins.append(coin)
+    return world, players, coins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[4, 16, 64, 256, 1024, 4096])
+    parser.add_argument("--coins", type=int, default=50)
+    parser.add_argument("--atlas", action="store_true", help="cut textures out of the packed atlas")
+    args = parser.parse_args()
+
+    if args.atlas:
+        textures.load_atlas()
+
+    print(f"{'agents':>8} {'cold s':>10} {'warm s':>10} {'warm us/agent':>14}")
+    for count in args.counts:
+        clear_caches()
+        start = time.perf_counter()
+        startup(count, args.coins)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        startup(count, args.coins)
+        warm = time.perf_counter() - start
+        print(f"{count:>8} {cold:>10.4f} {warm:>10.4f} {1e6 * warm / count:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
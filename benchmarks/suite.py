@@ -0,0 +1,237 @@
+"""
+Headless simulation benchmark suite
+
+Measures ticks/second and peak memory of the headless World at increasing
+agent and food counts, both with agents scattered over the world and from
+the default spawn, where they start in one clump and crowd the same few
+cells, and times the hot paths of a tick on their own:
+the batched visibility query, target selection and each foraging
+strategy, predator-prey sensing, food collision and removal, and food
+placement at setup.  Results are written as JSON; given a baseline, every
+metric is compared against it and the exit status is non-zero when any
+regressed by more than the tolerance.
+
+benchmarks/baseline.json holds the quick suite's results from the machine
+named in its meta; refresh it with --save-baseline after an intended
+speed change, or when moving to other hardware, and commit it.
+
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json [--tolerance 0.25]
+    python benchmarks/suite.py --full   # up to 100k agents and 1M food
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collision import resolve_food_contacts  # noqa: E402
+from config import SimConfig, WORLD_WIDTH, WORLD_HEIGHT  # noqa: E402
+from population import STRATEGIES  # noqa: E402
+from strategies import CHOOSERS  # noqa: E402
+from world import World, AGENT_RADIUS, FOOD_RADIUS  # noqa: E402
+
+# (agents, food) of each scaling case
+QUICK_CASES = [(4, 50), (100, 1000), (1000, 10000), (10000, 20000)]
+FULL_CASES = QUICK_CASES + [(10000, 100000), (100000, 1000000)]
+
+# World area per food item; the world is grown past its default size when
+# the food would not fit at this density
+AREA_PER_FOOD = 64 * 64
+
+# Size of the world the hot paths are timed in
+HOT_AGENTS = 1000
+HOT_FOOD = 10000
+HOT_PREDATORS = 100
+
+# Whether a larger value of each kind of metric is better
+HIGHER_IS_BETTER = {"ticks_per_second": True, "peak_mb": False, "ms": False}
+
+
+def make_world(agents, food, seed=0, predators=0, clumped=False):
+    """
+    A set up world with agents scattered uniformly, so large populations
+    spread over the grid as they would after running for a while, or
+    with clumped left where the default spawn puts them.
+    """
+    scale = max(1.0, np.sqrt(food * AREA_PER_FOOD / (WORLD_WIDTH * WORLD_HEIGHT)))
+    config = SimConfig(player_count=agents, coin_count=food, predator_count=predators, seed=seed,
+                       world_width=int(WORLD_WIDTH * scale), world_height=int(WORLD_HEIGHT * scale))
+    world = World(config)
+    world.setup()
+    if clumped:
+        return world
+    lower = world.physics.lower + AGENT_RADIUS
+    upper = world.physics.upper - AGENT_RADIUS
+    world.agents.positions[:] = world.rng.uniform(lower, upper, (agents + predators, 2))
+    return world
+
+
+def scaling_case(agents, food, ticks, clumped=False):
+    """
+    Speed and memory of one case.  tracemalloc slows numpy down, so memory
+    is measured on a second world rather than while timing the first.
+    """
+    start = time.perf_counter()
+    world = make_world(agents, food, clumped=clumped)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    world.run(max_ticks=ticks)
+    elapsed = time.perf_counter() - start
+    ticks_run = world.tick
+    del world
+
+    tracemalloc.start()
+    make_world(agents, food, clumped=clumped).run(max_ticks=ticks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"setup_ms": 1e3 * setup,
+            "ticks_per_second": ticks_run / elapsed if elapsed > 0 else 0.0,
+            "peak_mb": peak / 2 ** 20}
+
+
+def best_of(function, repeats):
+    """
+    Fastest of repeats calls of function in milliseconds, and the result of
+    the last call.
+    """
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return 1e3 * best, result
+
+
+def hot_paths(repeats):
+    world = make_world(HOT_AGENTS, HOT_FOOD)
+    agents = world.agents
+    everyone = np.arange(HOT_AGENTS)
+    timings = {}
+
+    timings["visibility"], _ = best_of(
+        lambda: world.food_grid.query_radius_batch(agents.positions, agents.vision_radius), repeats)
+
+    def choose():
+        agents.clear_targets(everyone)
+        world.choose_targets(everyone)
+    timings["targets"], _ = best_of(choose, repeats)
+
+    # Every strategy on the same visible pairs
+    rows, ids, positions = world.food_grid.query_radius_batch(agents.positions, agents.vision_radius)
+    for name, choose in zip(STRATEGIES, CHOOSERS):
+        timings[f"strategy_{name.lower()}"], _ = best_of(
+            lambda: choose(world, everyone, rows, ids, positions), repeats)
+
+    hunted = make_world(HOT_AGENTS, HOT_FOOD, predators=HOT_PREDATORS)
+    timings["hunting"], _ = best_of(hunted.hunt, repeats)
+
+    # Rebuilding the contact grid is part of every tick that ate food
+    def contacts():
+        world.contact_grid.build(world.food.ids, world.food.live_positions())
+        return resolve_food_contacts(agents.positions, AGENT_RADIUS, world.contact_grid, FOOD_RADIUS)
+    timings["contacts"], _ = best_of(contacts, repeats)
+
+    # Eating changes the world, so every repeat starts from a fresh one
+    # with each agent standing on a food item
+    removal = []
+    for _ in range(repeats):
+        fresh = make_world(HOT_AGENTS, HOT_FOOD)
+        fresh.agents.positions[:] = fresh.food_positions[:HOT_AGENTS]
+        ms, _ = best_of(fresh.eat, 1)
+        removal.append(ms)
+    timings["removal"] = min(removal)
+
+    timings["placement"], _ = best_of(lambda: world.place_food(HOT_FOOD), repeats)
+    return {name: {"ms": ms} for name, ms in timings.items()}
+
+
+def run_suite(cases, ticks, repeats):
+    results = {"meta": {"python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "machine": platform.machine(),
+                        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "ticks": ticks,
+                        "repeats": repeats},
+               "scaling": {},
+               "hot_paths": hot_paths(repeats)}
+    for agents, food in cases:
+        results["scaling"][f"{agents}x{food}"] = scaling_case(agents, food, ticks)
+        results["scaling"][f"{agents}x{food} clumped"] = scaling_case(agents, food, ticks, clumped=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    (section, case, metric, old, new) for every metric that is worse than
+    its baseline value by more than the fractional tolerance.
+    """
+    regressions = []
+    for section in ("scaling", "hot_paths"):
+        for case, metrics in results[section].items():
+            old_metrics = baseline.get(section, {}).get(case)
+            if old_metrics is None:
+                continue
+            for metric, new in metrics.items():
+                if metric not in HIGHER_IS_BETTER or metric not in old_metrics:
+                    continue
+                old = old_metrics[metric]
+                if HIGHER_IS_BETTER[metric]:
+                    worse = new < old * (1 - tolerance)
+                else:
+                    worse = new > old * (1 + tolerance)
+                if worse:
+                    regressions.append((section, case, metric, old, new))
+    return regressions
+
+
+def report(results):
+    print(f"{'case':>20} {'setup ms':>10} {'ticks/s':>10} {'peak MB':>10}")
+    for case, metrics in results["scaling"].items():
+        print(f"{case:>20} {metrics['setup_ms']:>10.1f} {metrics['ticks_per_second']:>10.1f} "
+              f"{metrics['peak_mb']:>10.1f}")
+    print()
+    print(f"{'hot path':>20} {'ms':>10}")
+    for name, metrics in results["hot_paths"].items():
+        print(f"{name:>20} {metrics['ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="include the 100k food and 100k agent cases")
+    parser.add_argument("--ticks", type=int, default=60, help="ticks stepped per scaling case")
+    parser.add_argument("--repeats", type=int, default=5, help="repeats per hot path, the best is kept")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write the results here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fraction a metric may be worse than its baseline before it counts as a regression")
+    args = parser.parse_args()
+
+    results = run_suite(FULL_CASES if args.full else QUICK_CASES, args.ticks, args.repeats)
+    report(results)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print()
+        for section, case, metric, old, new in regressions:
+            print(f"REGRESSION {section}/{case} {metric}: {old:.3f} -> {new:.3f}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+World checkpoints
+
+A checkpoint is one binary file: a fixed preamble, a JSON header and the
+world's arrays laid out raw, each starting on a 64-byte boundary.
+
+    preamble   MAGIC, format VERSION and header length   (struct "<8sII")
+    header     JSON: world metadata (config, RNG state, tick, ...) and the
+               offset, dtype and shape of every array
+    arrays     raw array data, offsets relative to the end of the header
+               padding
+
+Reading memory-maps the arrays instead of parsing them, so resuming costs
+little more than rebuilding the world's indices.  CheckpointWriter saves
+on an interval from a background thread and renames each file into place
+once complete, so a run killed mid-write leaves the previous checkpoint.
+
+    writer = CheckpointWriter("run.ckpt", interval=3600)
+    while not world.done:
+        world.step()
+        writer.update(world)
+    writer.close()
+
+    world = restore("run.ckpt")
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import struct
+
+import numpy as np
+
+from world import World
+
+MAGIC = b"ECOCKPT\n"
+VERSION = 2
+PREAMBLE = struct.Struct("<8sII")
+ALIGN = 64
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def save(path, meta, arrays):
+    """
+    Write metadata and arrays to path, atomically: the file is written
+    under a temporary name and renamed over path when complete.
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    start = _aligned(PREAMBLE.size + len(header))
+
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def load(path):
+    """
+    Metadata and read-only memory-mapped arrays of a checkpoint.
+    """
+    with open(path, "rb") as f:
+        magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+        if version != VERSION:
+            raise ValueError(f"{path} has checkpoint format {version}, expected {VERSION}")
+        header = json.loads(f.read(length))
+    start = _aligned(PREAMBLE.size + length)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        if np.prod(shape, dtype=np.int64) == 0:
+            # Empty arrays cannot be memory-mapped
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=start + entry["offset"], shape=shape)
+    return header["meta"], arrays
+
+
+def save_world(path, world):
+    save(path, *world.to_state())
+
+
+def restore(path):
+    """
+    The world saved at path, ready to step on from where it was saved.
+    """
+    return World.from_state(*load(path))
+
+
+class CheckpointWriter():
+    """
+    Saves a world every interval ticks without holding up the tick loop.
+
+    The tick loop only pays for copying the world's arrays; encoding and
+    writing happen on a background thread.  If the previous checkpoint is
+    still being written when the next is due, the new one is skipped.
+    """
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.last_tick = None
+        self.saved = 0
+        self.skipped = 0
+
+    def update(self, world):
+        """
+        Call once per tick; starts a checkpoint when one is due.
+        """
+        if world.tick % self.interval != 0 or world.tick == self.last_tick:
+            return False
+        self.last_tick = world.tick
+        if self.pending is not None and not self.pending.done():
+            self.skipped += 1
+            return False
+        self.write(world)
+        return True
+
+    def write(self, world):
+        if self.pending is not None:
+            # Surface errors of the previous write
+            self.pending.result()
+        meta, arrays = world.to_state()
+        self.pending = self.executor.submit(save, self.path, meta, arrays)
+        self.saved += 1
+
+    def close(self):
+        """
+        Wait for the last checkpoint to be written.
+        """
+        if self.pending is not None:
+            self.pending.result()
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,35 @@
+"""
+Batched agent-food contact resolution
+
+All contacts of a tick are found in one pass over a grid of the food
+instead of one sprite collision check per agent.  The grid's cells should
+be about the size of a contact, so each agent is only tested against the
+food that could touch it.
+"""
+import numpy as np
+
+
+def resolve_food_contacts(positions, agent_radius, food_grid, food_radius):
+    """
+    Find the food eaten this tick and who ate it.
+
+    food_grid is any index with a batched radius query, such as FoodGrid
+    or CellList.  The broad phase gathers the food in the grid cells around
+    each agent and the narrow phase keeps pairs whose circles overlap.  When
+    several agents touch the same food it goes to the closest one, ties
+    going to the lowest agent index, so the outcome does not depend on
+    iteration order.
+
+    Returns (agents, food_ids, food_positions) arrays with one entry per
+    eaten food, sorted by food id.
+    """
+    rows, ids, food_positions = food_grid.query_radius_batch(positions, agent_radius + food_radius)
+    if len(rows) == 0:
+        return rows, ids, food_positions
+
+    dists = np.sum((positions[rows] - food_positions) ** 2, axis=1)
+    order = np.lexsort((rows, dists, ids))
+    ids = ids[order]
+    first = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    winners = order[first]
+    return rows[winners], ids[first], food_positions[winners]
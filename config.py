@@ -0,0 +1,85 @@
+"""
+Simulation configuration
+
+Every tuning knob of a run lives on a SimConfig, which World and GameView
+take instead of reading module globals, so runs with different settings
+can share a process.  The module-level constants are the defaults.
+"""
+from dataclasses import dataclass, asdict, replace
+
+from population import (VISION_RADIUS, MOVEMENT_SPEED, ACCELERATION, START_ENERGY, FOOD_ENERGY,
+                        BASAL_METABOLISM, MOVE_METABOLISM, BIRTH_ENERGY, MAX_AGE, PREY_ENERGY,
+                        PREDATOR_SPEED, FLEE_RADIUS)
+
+WORLD_WIDTH = 6144
+WORLD_HEIGHT = 3456
+WALL_MARGIN = 128
+
+PLAYER_COUNT = 4
+COIN_COUNT = 50
+
+# Agent slots preallocated when agents are born and die
+MAX_AGENTS = 256
+
+# Runs that have not cleared the food after this many ticks are stopped
+MAX_TICKS = 60 * 60 * 10
+
+# Food regrowth: growth rate per food item and tick, the fraction of the
+# placement cells of a patch that can hold food, and a seasonal swing of
+# the growth rate over SEASON_PERIOD ticks
+REGROWTH_RATE = 0.002
+CARRYING_CAPACITY = 0.25
+SEASON_PERIOD = 60 * 60 * 2
+SEASON_AMPLITUDE = 0.5
+
+
+@dataclass(frozen=True)
+class SimConfig():
+    player_count: int = PLAYER_COUNT
+    coin_count: int = COIN_COUNT
+    vision_radius: float = VISION_RADIUS
+    movement_speed: float = MOVEMENT_SPEED
+    acceleration: float = ACCELERATION
+    # Fractional change of every agent's velocity per tick, e.g. -0.002
+    friction: float = 0.0
+    world_width: int = WORLD_WIDTH
+    world_height: int = WORLD_HEIGHT
+    wall_margin: int = WALL_MARGIN
+    pathfinding: bool = False
+    flow_field: bool = False
+    # Comma-separated foraging strategies, dealt out to the agents in turn,
+    # e.g. "NEAREST,GREEDY" for a half-and-half population
+    strategies: str = "RANDOM"
+    # With regrowth, eaten food grows back and a run only ends at max_ticks
+    regrowth: bool = False
+    regrowth_rate: float = REGROWTH_RATE
+    carrying_capacity: float = CARRYING_CAPACITY
+    season_period: int = SEASON_PERIOD
+    season_amplitude: float = SEASON_AMPLITUDE
+    # With lifecycle, agents burn energy, starve, age, and split in two when
+    # well fed, up to max_agents alive at once
+    lifecycle: bool = False
+    max_agents: int = MAX_AGENTS
+    start_energy: float = START_ENERGY
+    food_energy: float = FOOD_ENERGY
+    basal_metabolism: float = BASAL_METABOLISM
+    move_metabolism: float = MOVE_METABOLISM
+    birth_energy: float = BIRTH_ENERGY
+    max_age: int = MAX_AGE
+    # Predators scattered over the world next to the player_count
+    # herbivores; they see as far as herbivores and chase them faster
+    predator_count: int = 0
+    predator_speed: float = PREDATOR_SPEED
+    prey_energy: float = PREY_ENERGY
+    flee_radius: float = FLEE_RADIUS
+    # Tiled map (.tmx) of obstacles, water and fertile ground; the world
+    # takes the size of the map
+    terrain: str = None
+    seed: int = None
+    max_ticks: int = MAX_TICKS
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
@@ -0,0 +1,110 @@
+"""
+Parallel ensemble runner
+
+Runs many independent headless worlds across a process pool and streams a
+summary of each run back to the parent as soon as it finishes.  Each task
+is a whole run, so workers exchange only a parameter dict and a summary
+dict and the pool scales with the number of cores.
+
+    python ensemble.py --runs 32 --players 4 --coins 50 > runs.jsonl
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import sys
+import time
+
+from config import SimConfig
+from population import STRATEGIES, PREDATOR
+from world import World
+
+
+def run_world(config):
+    """
+    Run one world to completion and summarize it.
+
+    config is a SimConfig or a dict of its fields; the summary repeats it
+    next to the score and time_taken that GameOverView shows, whether the
+    food was cleared, the food eaten by the agents of each strategy, the
+    predators left and their kills, and how fast the run stepped.
+    """
+    if isinstance(config, dict):
+        config = SimConfig(**config)
+
+    start = time.perf_counter()
+    world = World(config)
+    world.setup()
+    score, time_taken = world.run()
+    wall = time.perf_counter() - start
+    # A run also ends when no herbivores are left to clear the food
+    cleared = len(world.food) == 0
+    food_by_strategy = dict(zip(STRATEGIES, world.food_by_strategy.tolist()))
+
+    return {
+        "params": config.to_dict(),
+        "score": score,
+        "time_taken": time_taken,
+        "ticks": world.tick,
+        "agents_alive": world.agents.count,
+        "predators_alive": int((world.agents.alive & (world.agents.species == PREDATOR)).sum()),
+        "kills": world.kills,
+        "food_by_strategy": food_by_strategy,
+        "cleared": cleared,
+        "time_to_clear": time_taken if cleared else None,
+        "wall_seconds": wall,
+        "ticks_per_second": world.tick / wall if wall > 0 else None,
+    }
+
+
+def run_ensemble(runs, workers=None, pool=None):
+    """
+    Run every config in runs and yield their summaries in the order they
+    finish.  Pass an existing pool to reuse its warm worker processes;
+    workers=1 runs in-process, which is handy for debugging and profiling.
+    """
+    if pool is None and workers == 1:
+        for config in runs:
+            yield run_world(config)
+        return
+
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from run_ensemble(runs, pool=pool)
+        return
+
+    futures = [pool.submit(run_world, config) for config in runs]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=os.cpu_count())
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run; runs count up from it")
+    parser.add_argument("--players", type=int, default=SimConfig.player_count)
+    parser.add_argument("--coins", type=int, default=SimConfig.coin_count)
+    parser.add_argument("--predators", type=int, default=SimConfig.predator_count)
+    parser.add_argument("--vision", type=float, default=SimConfig.vision_radius)
+    parser.add_argument("--speed", type=float, default=SimConfig.movement_speed)
+    parser.add_argument("--max-ticks", type=int, default=SimConfig.max_ticks)
+    parser.add_argument("--flow-field", action="store_true")
+    parser.add_argument("--strategies", default=SimConfig.strategies,
+                        help="comma-separated foraging strategies, dealt out to the agents in turn")
+    parser.add_argument("--terrain", default=None, help="Tiled map (.tmx) of the world's terrain")
+    args = parser.parse_args()
+
+    base = SimConfig(player_count=args.players, coin_count=args.coins, predator_count=args.predators,
+                     vision_radius=args.vision, movement_speed=args.speed, flow_field=args.flow_field,
+                     max_ticks=args.max_ticks, strategies=args.strategies, terrain=args.terrain)
+    runs = [base.replace(seed=args.seed + i) for i in range(args.runs)]
+
+    start = time.perf_counter()
+    for summary in run_ensemble(runs, args.workers):
+        print(json.dumps(summary), flush=True)
+    print(f"{args.runs} runs in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
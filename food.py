@@ -0,0 +1,198 @@
+"""
+Array-backed food store
+
+Food items are rows of a few preallocated arrays rather than objects, so a
+food item costs a handful of bytes and the renderer only makes sprites for
+the food near the viewport.  FoodField regrows eaten food patch by patch.
+"""
+import numpy as np
+
+# Births a patch expects per tick and unit of growth rate even when it is
+# empty, so eaten-out patches sprout again
+SEED = 0.5
+
+
+class FoodPool():
+    """
+    Food positions and liveness indexed by stable integer ids.
+
+    dense holds every id, the live ones packed at the front, and slot maps
+    an id back to its index in dense.  Removing food swaps the last live
+    ids into the holes, so adding and removing are O(1) per item and
+    checking liveness is a single alive[id] lookup.  Ids of removed food
+    are handed out again by later adds; the pool grows when it is full.
+    """
+    __slots__ = ("positions", "alive", "dense", "slot", "count")
+
+    def __init__(self, capacity=0):
+        self.positions = np.zeros((capacity, 2))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.dense = np.arange(capacity, dtype=np.int64)
+        self.slot = np.arange(capacity, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    @property
+    def ids(self):
+        """
+        Ids of the live food, in no particular order.
+        """
+        return self.dense[:self.count]
+
+    def live_positions(self):
+        return self.positions[self.ids]
+
+    def grow(self, capacity):
+        old = self.capacity
+        if capacity <= old:
+            return
+        positions = np.zeros((capacity, 2))
+        positions[:old] = self.positions
+        self.positions = positions
+        self.alive = np.r_[self.alive, np.zeros(capacity - old, dtype=bool)]
+        self.dense = np.r_[self.dense, np.arange(old, capacity, dtype=np.int64)]
+        self.slot = np.r_[self.slot, np.arange(old, capacity, dtype=np.int64)]
+
+    def add(self, positions):
+        """
+        Add food at positions; returns the ids given to it.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        n = len(positions)
+        if self.count + n > self.capacity:
+            self.grow(max(self.count + n, 2 * self.capacity))
+
+        # The first free ids sit right after the live ones in dense
+        ids = self.dense[self.count:self.count + n].copy()
+        self.positions[ids] = positions
+        self.alive[ids] = True
+        self.count += n
+        return ids
+
+    def remove(self, ids):
+        """
+        Remove the food with the given ids; dead or repeated ids are
+        ignored.
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.int64).reshape(-1))
+        ids = ids[self.alive[ids]]
+        n = len(ids)
+        if n == 0:
+            return
+        self.alive[ids] = False
+        count = self.count - n
+
+        # Live ids from the tail of the live block fill the holes the
+        # removed ids leave in front of it
+        slots = self.slot[ids]
+        holes = np.sort(slots[slots < count])
+        tail = self.dense[count:self.count]
+        movers = tail[self.alive[tail]]
+        self.dense[holes] = movers
+        self.slot[movers] = holes
+
+        self.dense[count:self.count] = ids
+        self.slot[ids] = np.arange(count, self.count)
+        self.count = count
+
+
+class FoodField():
+    """
+    Food regrowth on patches of the placement grid.
+
+    Every patch holds up to its carrying capacity of food and grows it
+    logistically: a patch with n items and capacity K expects
+
+        rate * season * (n + SEED) * (1 - n / K)
+
+    births per tick, drawn from a Poisson distribution and clipped to the
+    room left.  SEED lets emptied patches sprout again.  The season swings
+    growth sinusoidally around its mean.  Each birth takes a free cell of
+    the placer inside its patch, so regrown food keeps the placer's spacing.
+    Everything is per-patch arrays, so a tick costs the same however many
+    food items have come and gone.
+    """
+    def __init__(self, placer, patch_size, capacity, rate, season_period=0, season_amplitude=0.0,
+                 fertility=None):
+        """
+        capacity is the fraction of a patch's usable placer cells that can
+        hold food, rate the per-item growth rate per tick and fertility an
+        optional callable giving a multiplier of capacity for positions.
+        """
+        self.placer = placer
+        self.rate = float(rate)
+        self.season_period = season_period
+        self.season_amplitude = float(season_amplitude)
+
+        per_patch = max(int(patch_size // placer.cell_size), 1)
+        self.cols = -(-placer.cols // per_patch)
+        self.rows = -(-placer.rows // per_patch)
+        cells = np.arange(placer.cols * placer.rows)
+        # Patch of every placer cell
+        self.patch_of = (cells % placer.cols) // per_patch + (cells // placer.cols) // per_patch * self.cols
+
+        usable = np.bincount(self.patch_of[placer.usable], minlength=len(self))
+        self.capacity = float(capacity) * usable
+        if fertility is not None:
+            patch_cells = np.arange(len(self))
+            per_cell = placer.cell_size * per_patch
+            centers = placer.origin + per_cell * (np.column_stack([patch_cells % self.cols,
+                                                                  patch_cells // self.cols]) + 0.5)
+            self.capacity *= fertility(centers)
+        self.capacity = np.minimum(np.floor(self.capacity), usable).astype(np.int64)
+        self.counts = np.zeros(len(self), dtype=np.int64)
+
+    def __len__(self):
+        return self.cols * self.rows
+
+    def patches(self, positions):
+        return self.patch_of[self.placer.cells_of(positions)]
+
+    def add(self, positions):
+        self.counts += np.bincount(self.patches(positions), minlength=len(self))
+
+    def remove(self, positions):
+        self.counts -= np.bincount(self.patches(positions), minlength=len(self))
+
+    def season(self, tick):
+        if not self.season_period:
+            return 1.0
+        return 1.0 + self.season_amplitude * np.sin(2 * np.pi * tick / self.season_period)
+
+    def births(self, tick, rng):
+        """
+        Number of new food items in every patch this tick.
+        """
+        room = np.maximum(self.capacity - self.counts, 0)
+        fill = np.divide(self.counts, self.capacity, out=np.ones(len(self)), where=self.capacity > 0)
+        expected = self.rate * self.season(tick) * (self.counts + SEED) * (1 - fill)
+        return np.minimum(rng.poisson(np.maximum(expected, 0.0)), room)
+
+    def grow(self, tick, rng):
+        """
+        Place this tick's births; returns their positions, which the caller
+        adds to the field along with the rest of the food indices.
+        """
+        births = self.births(tick, rng)
+        if not births.any():
+            return np.zeros((0, 2))
+
+        # Shuffle the free cells of the patches with births, then give each
+        # patch the first of its cells
+        placer = self.placer
+        free = np.flatnonzero(placer.usable & ~placer.occupied)
+        patches = self.patch_of[free]
+        wanted = births[patches] > 0
+        free = free[wanted]
+        patches = patches[wanted]
+        order = np.lexsort((rng.random(len(free)), patches))
+        free = free[order]
+        patches = patches[order]
+        rank = np.arange(len(free)) - np.searchsorted(patches, patches)
+        return placer.fill(free[rank < births[patches]], rng)
@@ -8,176 +8,126 @@ Artwork from http://kenney.nl
 If Python and Arcade are installed, this example can be run from the command line with:
 python -m arcade.examples.sprite_move_animation
 """
+import argparse
 import arcade
-import random
 import os
 import numpy as np
 import pymunk
+from arcade.gl import BufferDescription
+
+import textures
+from config import SimConfig
+from population import PREDATOR
+from profiler import Profiler, NULL_PROFILER
+from recorder import TrajectoryReader, ReplayWorld
+from world import World, FixedStepper
 
 SCREEN_WIDTH = 1920
 SCREEN_HEIGHT = 1080
-WORLD_WIDTH = 6144
-WORLD_HEIGHT = 3456
-WALL_MARGIN = 128
 SCREEN_TITLE = "Move with a Sprite Animation Example"
 
 
 
-PLAYER_COUNT = 4
 COIN_SCALE = 0.5
-COIN_COUNT = 50
-CHARACTER_SCALING = 1
-VISION_RADIUS = 350
-MOVEMENT_SPEED = 8
 UPDATES_PER_FRAME = 7
+COIN_UPDATES_PER_FRAME = 15
 SCROLL_SPEED = 25
-FRICTION = -0.002
+
+# Sprites are only materialized within this distance of the viewport
+CULL_MARGIN = 128
+# Line segments per vision circle, and the most circles drawn; with more
+# agents in view than that the circles are skipped altogether
+VISION_SEGMENTS = 32
+MAX_VISION_RINGS = 1000
+
+# Above this viewport width agents are drawn as points and food as a
+# heatmap of HEATMAP_TILE sized tiles instead of animated sprites
+LOD_WIDTH = 2 * SCREEN_WIDTH
+HEATMAP_TILE = 128
+
+# Ticks skipped by one press of the replay seek keys
+REPLAY_SEEK = 600
+
+# Fill colours of the terrain layers of a tilemap world
+TERRAIN_COLORS = {"fertile": (34, 139, 34, 160),
+                  "water": (30, 100, 200, 255),
+                  "obstacles": (110, 110, 110, 255)}
+
+# Character skins, indexed by the skin of a world agent
+CHARACTER_SKINS = [":resources:images/animated_characters/female_adventurer/femaleAdventurer",
+                   ":resources:images/animated_characters/female_person/femalePerson",
+                   ":resources:images/animated_characters/male_person/malePerson",
+                   ":resources:images/animated_characters/male_adventurer/maleAdventurer",
+                   ":resources:images/animated_characters/zombie/zombie",
+                   ":resources:images/animated_characters/robot/robot"]
+
+# Monster portraits of predators, indexed by the skin of a world agent
+PREDATOR_PORTRAITS = ["VOC_01", "VOC_02", "VOC_03", "VOC_04", "t01", "u01"]
+CHARACTER_SCALE = 0.8
+PORTRAIT_SCALE = 0.35
 
 # Constants used to track if the player is facing left or right
 RIGHT_FACING = 0
 LEFT_FACING = 1
 
 
-def load_texture_pair(filename):
-    """
-    Load a texture pair, with the second being a mirror image.
+class PlayerCharacter(arcade.Sprite):
     """
-    return [
-        arcade.load_texture(filename),
-        arcade.load_texture(filename, mirrored=True)
-    ]
+    Sprite that renders one agent of the world.
 
-
-class PlayerCharacter(arcade.Sprite):
-    def __init__(self,view):
+    GameView only keeps sprites for the agents near the viewport and hands
+    a sprite that scrolled out of view to another agent with bind(), so
+    sprites are recycled rather than created per agent.
+    """
+    def __init__(self, agents, index):
 
         # Set up parent class
         super().__init__()
-        # Register the calling view
-        self.view = view
-        self.physics_engine = arcade.PhysicsEngineSimple(self, self.view.wall_list)
+        # The agent store and the index of the agent this sprite draws
+        self.agents = agents
         # Default to face-right
         self.character_face_direction = RIGHT_FACING
 
-        # Used for flipping between image sequences
-        self.cur_texture = 0
-
-        # Track out state
-        self.jumping = False
-        self.climbing = False
-        self.is_on_ladder = False
-        self.scale = CHARACTER_SCALING
-        self.vision_radius = VISION_RADIUS
-        self.strategy = "RANDOM"
-        self.acceleration = 0.3
-        self.should_accelerate = True
-
-        # Find food
-        self.target = None
-
         # Adjust the collision box. Default includes too much empty space
         # side-to-side. Box is centered at sprite center, (0, 0)
         self.points = [[-22, -64], [22, -64], [22, 28], [-22, 28]]
 
+        self.bind(index)
 
-        self.position = np.random.normal([SCREEN_WIDTH//2,SCREEN_HEIGHT//2],100.0)
-        
-        self.scale = 0.8
-        self.counter = 0
-        # --- Load Textures ---
-
-        # Images from Kenney.nl's Asset Pack 3
-        main_path = np.random.choice([":resources:images/animated_characters/female_adventurer/femaleAdventurer",
-                                      ":resources:images/animated_characters/female_person/femalePerson",
-                                      ":resources:images/animated_characters/male_person/malePerson",
-                                      ":resources:images/animated_characters/male_adventurer/maleAdventurer",
-                                      ":resources:images/animated_characters/zombie/zombie",
-                                      ":resources:images/animated_characters/robot/robot"], 1)[0]
-
-        # Load textures for idle standing
-        self.idle_texture_pair = load_texture_pair(f"{main_path}_idle.png")
-
-        # Load textures for walking
-        self.walk_textures = []
-        for i in range(8):
-            texture = load_texture_pair(f"{main_path}_walk{i}.png")
-            self.walk_textures.append(texture)
-
-
-    def choose_target(self):
-        visible_coins = self.view.get_visible_coins(self.position,self.vision_radius)
-        
-        if len(visible_coins) > 0:
-            #choose from visible coins using a strategy
-            ind = np.random.choice(visible_coins,1)[0]
-            #print(visible_coins,ind)
-            self.target = self.view.coin_list[ind]
-            self.target.color = arcade.color.AIR_FORCE_BLUE
-        
-
-
-
-    def move_towards_target(self,ctr):
-        # Check if someone else has beat you to the target
-        if self.target not in self.view.coin_list:
-            self.target = None
-            print("No target")
-
-
-        if self.target:
-            # get position vector and normalize it
-            s = np.array(self.target.position) - self.position
-            dist = np.linalg.norm(s)
-            
-            s = s/ dist
-
-            # get velocity
-            v = np.array(self.velocity)
-            # get acceleration vector along the position vector
-            acc_radial = s # towards target
-            acc_corrective = 0
-            if np.linalg.norm(v) > 0:
-                acc_corrective = s - v/np.linalg.norm(v)
-
-            acc = acc_radial + acc_corrective
-            acc = self.acceleration / np.linalg.norm(acc) * acc
-            #accelerate until vmax
-            
-            v += acc 
-    
-            # accelerate in that direction
-            clip = min(MOVEMENT_SPEED, np.linalg.norm(v))
-            v = clip * v/np.linalg.norm(v)
-
-            self.velocity = list(v)
-            
-            if arcade.check_for_collision(self,self.target):
-                self.target = None
-
+    def bind(self, index):
+        """
+        Point the sprite at another agent of the store.
+        """
+        self.index = index
+
+        # Images from Kenney.nl's Asset Pack 3, shared by every sprite of a
+        # skin; predators show a monster portrait instead
+        skin = self.agents.skins[index]
+        if self.agents.species[index] == PREDATOR:
+            self.scale = PORTRAIT_SCALE
+            self.idle_texture_pair, self.walk_textures = textures.portrait_textures(PREDATOR_PORTRAITS[skin])
         else:
+            self.scale = CHARACTER_SCALE
+            self.idle_texture_pair, self.walk_textures = textures.character_textures(CHARACTER_SKINS[skin])
+        self.texture = self.idle_texture_pair[self.character_face_direction]
 
-        # search for target
-            if ctr==0:
-                theta = np.random.uniform(high=2*np.pi)
-
-                v = MOVEMENT_SPEED* np.array([np.cos(theta), np.sin(theta)])
-
-                self.velocity = v
-            self.choose_target()
-
-    def on_update(self,delta_time = 1/60):
-        self.physics_engine.update()
-
-        if not self.target and len(self.view.coin_list) > 0:
-            self.choose_target()
-        
-        self.move_towards_target(self.counter)
+        self.sync()
 
-        self.counter = (self.counter+1)% 15
+    def sync(self):
+        """
+        Copy the agent's kinematic state onto the sprite.
+        """
+        self.position = tuple(self.agents.positions[self.index])
+        self.velocity = list(self.agents.velocities[self.index])
 
-        
-    def update_animation(self, delta_time: float = 1/60):
+    def animate(self, tick):
+        """
+        Pick the texture for the given world tick.
 
+        The walk cycle is a function of the tick, offset per agent so they
+        do not step in unison, so it only has to be evaluated for sprites
+        that are actually drawn.
+        """
         # Figure out if we need to flip face left or right
         if self.change_x < 0 and self.character_face_direction == RIGHT_FACING:
             self.character_face_direction = LEFT_FACING
@@ -190,14 +140,44 @@ class PlayerCharacter(arcade.Sprite):
             return
 
         # Walking animation
-        self.cur_texture += 1
-        if self.cur_texture > 7 * UPDATES_PER_FRAME:
-            self.cur_texture = 0
-        self.texture = self.walk_textures[self.cur_texture // UPDATES_PER_FRAME][self.character_face_direction]
+        frame = (tick // UPDATES_PER_FRAME + self.index) % len(self.walk_textures)
+        self.texture = self.walk_textures[frame][self.character_face_direction]
+
+
+def animate_coin(coin, tick):
+    """
+    Turn a coin to the facing it has at the given world tick.
+    """
+    frame = (tick // COIN_UPDATES_PER_FRAME + coin.food_id) % len(coin.textures)
+    coin.texture = coin.textures[frame]
+
+
+def create_vision_lines(segments, color, line_width):
+    """
+    arcade.create_lines for an (n, 2) array of segment end points, filling
+    the vertex buffer from the array instead of point by point.
+    """
+    ctx = arcade.get_window().ctx
+    data = np.zeros(len(segments), dtype=[("vertex", "2f4"), ("color", "4B")])
+    data["vertex"] = segments
+    data["color"] = arcade.get_four_byte_color(color)
+    vbo = ctx.buffer(data=data.tobytes())
+
+    shape = arcade.Shape()
+    shape.vbo = vbo
+    shape.vao = ctx.geometry([BufferDescription(vbo, "2f 4f1", ("in_vert", "in_color"), normalized=["in_color"])])
+    shape.program = ctx.line_generic_with_colors_program
+    shape.program["Projection"] = arcade.get_projection().flatten()
+    shape.mode = ctx.LINES
+    shape.line_width = line_width
+    return shape
+
 
 class GameOverView(arcade.View):
-    def __init__(self):
+    def __init__(self, config=None):
         super().__init__()
+        # Settings of the finished run, reused when restarting
+        self.config = config
         self.time_taken = 0
         self.score = 0
 
@@ -228,14 +208,14 @@ class GameOverView(arcade.View):
         arcade.draw_text(output_total, 10, 10, arcade.color.WHITE, 14)
 
     def on_mouse_press(self, _x, _y, _button, _modifiers):
-        game_view = GameView()
+        game_view = GameView(self.config)
         game_view.setup()
         self.window.show_view(game_view)
         pass
        
 
 class GameView(arcade.View):
-    def __init__(self):
+    def __init__(self, config=None, profiler=None, replay=None):
         super().__init__()
 
         """
@@ -249,105 +229,270 @@ class GameView(arcade.View):
         self.scroll_right =False
         self.viewport_width,self.viewport_height = SCREEN_WIDTH,SCREEN_HEIGHT
 
-        # Sprite lists
+        # The simulation being rendered and the clock driving it.  With a
+        # replay directory, a recorded run is played back instead
+        self.config = config or SimConfig()
+        self.replay = replay
+        self.world = None
+
+        # Times the world's tick phases and the view's own; P toggles the
+        # overlay and T dumps the summary, with the trace when one is kept
+        self.profiler = profiler or NULL_PROFILER
+        self.show_profile = self.profiler.enabled
+        self.stepper = None
+
+        # Sprite lists, holding only what is near the viewport
         self.player_list = None
         self.coin_list = None
         self.wall_list = None
-
-        # Set up the player
-        self.score = 0
-        self.player = None
-        self.player_agent = None
-        self.path_to_goal = None
-
-        # to track the number of update calls
-        self.counter = 0
-        self.movex = 0
-        self.movey = 0
-        self.move_randomly = True
-        self.target_coin = None
-        self.time_taken = 0
+        # Terrain of a tilemap world, drawn as one batch of rectangles
+        self.terrain_shapes = None
+
+        # Materialized sprites keyed by agent index and food id, and the
+        # sprites that scrolled out of view, kept for reuse
+        self.player_sprites = {}
+        self.coin_sprites = {}
+        self.spare_players = []
+        self.spare_coins = []
+        # Ids of the coins currently tinted as someone's target
+        self.highlighted = set()
+
+        # Batched overlays, rebuilt along with the visible sprites
+        self.vision_shapes = None
+        self.food_markers = []
+
+        # World tick the drawn sprites were last animated for, and the tick
+        # and view bounds the visible set was last built for
+        self.animated_tick = None
+        self.visible_key = None
+
+        # Zoomed-out level of detail: agent points, and the food heatmap
+        # with the score and food count it was built for
+        self.lod = False
+        self.agent_points = []
+        self.heatmap = None
+        self.heatmap_food = None
 
     def setup(self):
+        if self.replay is not None:
+            self.world = ReplayWorld(TrajectoryReader(self.replay))
+            self.config = self.world.config
+        else:
+            self.world = World(self.config)
+        self.world.profiler = self.profiler
+        self.world.setup()
+        self.stepper = FixedStepper(self.world)
+
         self.player_list = arcade.SpriteList()
         self.coin_list = arcade.SpriteList()
-        self.wall_list = arcade.SpriteList(use_spatial_hash=True)
-
-        # Set up the player
-        self.score = 0        
-
-        for _ in range(PLAYER_COUNT):
-            self.player_list.append(PlayerCharacter(self))
-
-        #bottom and top wall
-        for x in range(-WALL_MARGIN , WORLD_WIDTH+WALL_MARGIN+1, 64):
+        self.wall_list = arcade.SpriteList(use_spatial_hash=True, is_static=True)
+        self.player_sprites = {}
+        self.coin_sprites = {}
+        self.spare_players = []
+        self.spare_coins = []
+        self.highlighted = set()
+        self.visible_key = None
+
+        for left, bottom, _, _ in self.world.walls:
             wall = arcade.Sprite(":resources:images/tiles/brickBrown.png", 0.5)
-            wall.left = x 
-            wall.bottom = -WALL_MARGIN
+            wall.left = left
+            wall.bottom = bottom
             self.wall_list.append(wall)
+        self.build_terrain()
 
-            wall = arcade.Sprite(":resources:images/tiles/brickBrown.png", 0.5)
-            wall.left = x 
-            wall.bottom = WORLD_HEIGHT + WALL_MARGIN
-            self.wall_list.append(wall)
-
-        # left and right walls
-        for y in range(-WALL_MARGIN , WORLD_HEIGHT+WALL_MARGIN+1, 64):
-            wall = arcade.Sprite(":resources:images/tiles/brickBrown.png", 0.5)
-            wall.left = - WALL_MARGIN 
-            wall.bottom = y
-            self.wall_list.append(wall)
+        self.update_visible()
 
-            wall = arcade.Sprite(":resources:images/tiles/brickBrown.png", 0.5)
-            wall.left = WORLD_WIDTH + WALL_MARGIN
-            wall.bottom = y
-            self.wall_list.append(wall)
-
-        
+        # Set the background color
+        arcade.set_background_color(arcade.color.AMAZON)
 
-        for i in range(COIN_COUNT):
-            coin = arcade.AnimatedTimeSprite(scale=0.5)
-            
-            coin.textures = []
-            coin.textures.append(arcade.load_texture("./Sprites/Isometric/apple_NE.png"))
-            coin.textures.append(arcade.load_texture("./Sprites/Isometric/apple_NW.png"))
-            coin.textures.append(arcade.load_texture("./Sprites/Isometric/apple_SW.png"))
-            coin.textures.append(arcade.load_texture("./Sprites/Isometric/apple_SE.png"))
-            coin.scale = COIN_SCALE
-            coin.cur_texture_index = random.randrange(len(coin.textures))
-            coin.texture= coin.textures[coin.cur_texture_index]
-            
-            # Boolean variable if we successfully placed the coin
-            coin_placed_successfully = False
+    def build_terrain(self):
+        """
+        Batch the merged terrain rectangles of every layer, fertile ground
+        first so obstacles and water are drawn over it.
+        """
+        self.terrain_shapes = None
+        terrain = self.world.terrain
+        if terrain is None:
+            return
+        self.terrain_shapes = arcade.ShapeElementList()
+        corners = np.array([[0, 0], [1, 0], [1, 1], [0, 1]])
+        for name in ("fertile", "water", "obstacles"):
+            rects = terrain.world_rectangles(name)
+            if len(rects) == 0:
+                continue
+            points = rects[:, None, :2] + corners[None, :, :] * rects[:, None, 2:]
+            colors = [TERRAIN_COLORS[name]] * len(points.reshape(-1, 2))
+            self.terrain_shapes.append(arcade.create_rectangles_filled_with_colors(
+                points.reshape(-1, 2).tolist(), colors))
+
+    def visible_bounds(self, margin=0):
+        """
+        (left, bottom, right, top) of the viewport grown by margin.
+        """
+        return (self.view_left - margin, self.view_bottom - margin,
+                self.view_left + self.viewport_width + margin,
+                self.view_bottom + self.viewport_height + margin)
+
+    def in_view(self, positions, margin=0):
+        left, bottom, right, top = self.visible_bounds(margin)
+        x = positions[:, 0]
+        y = positions[:, 1]
+        return (x >= left) & (x <= right) & (y >= bottom) & (y <= top)
+
+    def make_coin(self):
+        coin = arcade.Sprite(scale=0.5)
+        coin.textures = textures.food_textures("apple")
+        coin.scale = COIN_SCALE
+        return coin
+
+    def release_sprites(self):
+        """
+        Move every materialized sprite to the spares.
+        """
+        for player in self.player_sprites.values():
+            player.remove_from_sprite_lists()
+            self.spare_players.append(player)
+        for coin in self.coin_sprites.values():
+            coin.remove_from_sprite_lists()
+            self.spare_coins.append(coin)
+        self.player_sprites = {}
+        self.coin_sprites = {}
+        self.highlighted = set()
+
+    def update_heatmap(self):
+        """
+        Rebuild the food heatmap as one batch of tiles, shaded by how much
+        food each tile holds.  Only done when food was eaten or grew.
+        """
+        key = (self.world.score, len(self.world.food))
+        if self.heatmap is not None and self.heatmap_food == key:
+            return
+        food = self.world.food_positions
+        self.heatmap_food = key
+        self.heatmap = arcade.ShapeElementList()
+        if len(food) == 0:
+            return
 
-            # Keep trying until success
-            while not coin_placed_successfully:
-                # Position the coin
-                coin.center_x = random.randrange(WORLD_WIDTH)
-                coin.center_y = random.randrange(WORLD_HEIGHT)
+        tiles = np.floor(food / HEATMAP_TILE).astype(np.int64)
+        cells, counts = np.unique(tiles, axis=0, return_counts=True)
+        alpha = (64 + 191 * counts / counts.max()).astype(int)
+        corners = np.array([[0, 0], [1, 0], [1, 1], [0, 1]])
+        points = (cells[:, None, :] + corners[None, :, :]) * HEATMAP_TILE
+        colors = [(255, 0, 0, a) for a in alpha.tolist() for _ in range(4)]
+        self.heatmap.append(arcade.create_rectangles_filled_with_colors(
+            points.reshape(-1, 2).tolist(), colors))
 
-                # See if the coin is hitting a wall
-                wall_hit_list = arcade.check_for_collision_with_list(coin, self.wall_list)
+    def update_lod(self):
+        """
+        Zoomed-out view: no sprites, no animation, agents as points.
+        """
+        if self.player_sprites or self.coin_sprites:
+            self.release_sprites()
+        self.vision_shapes = None
+        self.food_markers = []
 
-                # See if the coin is hitting another coin
-                coin_hit_list = arcade.check_for_collision_with_list(coin, self.coin_list)
+        agents = self.world.agents
+        self.agent_points = agents.positions[agents.alive & self.in_view(agents.positions)].tolist()
+        self.update_heatmap()
 
-                if len(wall_hit_list) == 0 and len(coin_hit_list) == 0:
-                    # It is!
-                    coin_placed_successfully = True
+    def update_visible(self):
+        """
+        Materialize sprites for the agents and food near the viewport only,
+        recycling the ones that left it, and rebuild the batched overlays.
+        Nothing changes until the world steps or the view moves.
+        """
+        key = (self.world.tick, self.visible_bounds())
+        if key == self.visible_key:
+            return
+        self.visible_key = key
 
-            # Add the coin to the lists
-            self.coin_list.append(coin)
+        self.lod = self.viewport_width > LOD_WIDTH
+        if self.lod:
+            self.update_lod()
+            return
 
-            # --- END OF IMPORTANT PART ---
-           
-            #
-            
-            
-
-        
-        # Set the background color
-        arcade.set_background_color(arcade.color.AMAZON)
+        agents = self.world.agents
+
+        # Players; dead agents drop out of the visible set, and sprites of
+        # slots that were reborn are rebound to pick up the newborn's skin
+        indices = np.flatnonzero(agents.alive & self.in_view(agents.positions, CULL_MARGIN))
+        visible = set(indices.tolist())
+        for index in set(self.player_sprites) - visible:
+            player = self.player_sprites.pop(index)
+            player.remove_from_sprite_lists()
+            self.spare_players.append(player)
+        for index in visible.intersection(self.stepper.born, self.player_sprites):
+            self.player_sprites[index].bind(index)
+        for index in visible - set(self.player_sprites):
+            if self.spare_players:
+                player = self.spare_players.pop()
+                player.bind(index)
+            else:
+                player = PlayerCharacter(agents, index)
+            self.player_list.append(player)
+            self.player_sprites[index] = player
+        # Copy the kinematic state onto the drawn sprites, read from the
+        # store for all of them at once
+        players = list(self.player_list)
+        rows = np.fromiter((player.index for player in players), dtype=np.int64, count=len(players))
+        for player, position, velocity in zip(players, agents.positions[rows].tolist(),
+                                              agents.velocities[rows].tolist()):
+            player.position = tuple(position)
+            player.velocity = velocity
+
+        # Coins; eaten food drops out of the visible set.  Food ids are
+        # reused, so the sprite of food eaten this update is dropped even
+        # when its id already belongs to new food
+        food_ids = self.world.food_ids
+        food_positions = self.world.food.positions[food_ids]
+        in_view = self.in_view(food_positions, CULL_MARGIN)
+        food_ids = food_ids[in_view]
+        food_positions = food_positions[in_view]
+        visible = set(food_ids.tolist())
+        gone = (set(self.coin_sprites) - visible) | set(self.stepper.eaten).intersection(self.coin_sprites)
+        for food_id in gone:
+            coin = self.coin_sprites.pop(food_id)
+            coin.remove_from_sprite_lists()
+            self.spare_coins.append(coin)
+        self.highlighted -= gone
+        added = visible - set(self.coin_sprites)
+        if added:
+            new = np.isin(food_ids, list(added))
+            for food_id, (x, y) in zip(food_ids[new].tolist(), food_positions[new].tolist()):
+                coin = self.spare_coins.pop() if self.spare_coins else self.make_coin()
+                coin.food_id = food_id
+                animate_coin(coin, self.world.tick)
+                coin.center_x = x
+                coin.center_y = y
+                coin.color = arcade.color.WHITE
+                self.coin_list.append(coin)
+                self.coin_sprites[food_id] = coin
+
+        # Highlight the food agents are heading for, touching only the
+        # coins whose highlight changed
+        targeted = visible.intersection(agents.targets[agents.has_target].tolist())
+        for food_id in self.highlighted - targeted:
+            if food_id in self.coin_sprites:
+                self.coin_sprites[food_id].color = arcade.color.WHITE
+        for food_id in targeted - self.highlighted:
+            self.coin_sprites[food_id].color = arcade.color.AIR_FORCE_BLUE
+        self.highlighted = targeted
+
+        # Food markers, drawn as one batch of points
+        self.food_markers = food_positions.tolist()
+
+        # Vision circles of the agents whose circle reaches the viewport,
+        # as one batch of line segments
+        near = agents.alive & self.in_view(agents.positions, agents.vision_radius)
+        self.vision_shapes = None
+        if 0 < np.count_nonzero(near) <= MAX_VISION_RINGS:
+            theta = np.linspace(0, 2 * np.pi, VISION_SEGMENTS + 1)
+            circle = np.column_stack([np.cos(theta), np.sin(theta)])
+            rings = (agents.positions[near, None, :] +
+                     agents.vision_radius[near, None, None] * circle[None, :, :])
+            segments = np.stack([rings[:, :-1], rings[:, 1:]], axis=2).reshape(-1, 2)
+            self.vision_shapes = arcade.ShapeElementList()
+            self.vision_shapes.append(create_vision_lines(segments, arcade.color.WHITE, 3))
 
     def on_mouse_scroll(self, x: int, y: int, scroll_x: int, scroll_y: int):
 
@@ -357,8 +502,10 @@ class GameView(arcade.View):
             self.viewport_height = int(max(self.viewport_height*0.8,540))
 
         elif scroll_y < 0: #zoom out
-            self.viewport_width = int(min(self.viewport_width*1.2,WORLD_WIDTH+2*WALL_MARGIN))
-            self.viewport_height = int(min(self.viewport_height*1.2,WORLD_HEIGHT+2*WALL_MARGIN))
+            self.viewport_width = int(min(self.viewport_width*1.2,
+                                          self.config.world_width+2*self.config.wall_margin))
+            self.viewport_height = int(min(self.viewport_height*1.2,
+                                           self.config.world_height+2*self.config.wall_margin))
         
         
         print(self.viewport_width,self.viewport_height)
@@ -382,21 +529,46 @@ class GameView(arcade.View):
         # This command has to happen before we start drawing
         arcade.start_render()
 
-        # Draw all the sprites.
-        self.coin_list.draw()
-        self.player_list.draw()
-        self.wall_list.draw()
-        for player in self.player_list:
-            arcade.draw_circle_outline(player.center_x,
-                                       player.center_y,
-                                       player.vision_radius,
-                                       arcade.color.WHITE, 3)
-        # Put the text on the screen.
-        output = f"Score: {self.score}"
-        arcade.draw_text(output, 10, 20, arcade.color.WHITE, 14)
-
-        for coin in self.coin_list:
-            arcade.draw_point(coin.center_x, coin.center_y, arcade.color.RED, 10)
+        if self.terrain_shapes is not None:
+            self.terrain_shapes.draw()
+        if self.lod:
+            self.heatmap.draw()
+            if self.agent_points:
+                arcade.draw_points(self.agent_points, arcade.color.WHITE, 6)
+
+        # Animate only what is drawn, and only when the world has moved on
+        with self.profiler.phase("animation"):
+            if self.animated_tick != self.world.tick:
+                self.animated_tick = self.world.tick
+                for coin in self.coin_list:
+                    animate_coin(coin, self.world.tick)
+                for player in self.player_list:
+                    player.animate(self.world.tick)
+
+        with self.profiler.phase("draw"):
+            # Draw the sprites near the viewport
+            self.coin_list.draw()
+            self.player_list.draw()
+            self.wall_list.draw()
+            if self.vision_shapes is not None:
+                self.vision_shapes.draw()
+            # Put the text on the screen.
+            output = f"Score: {self.world.score}"
+            if self.config.lifecycle:
+                output += f"  Agents: {self.world.agents.count}"
+            if self.config.predator_count:
+                agents = self.world.agents
+                output += f"  Predators: {np.count_nonzero(agents.alive & (agents.species == PREDATOR))}"
+            if self.replay is not None:
+                output += f"  Replay tick {self.world.tick} x{self.world.speed:g}"
+            arcade.draw_text(output, 10, 20, arcade.color.WHITE, 14)
+
+            if self.food_markers:
+                arcade.draw_points(self.food_markers, arcade.color.RED, 10)
+
+        if self.show_profile:
+            for i, line in enumerate(self.profiler.lines()):
+                arcade.draw_text(line, 10, 44 + 18 * i, arcade.color.WHITE, 12, font_name="Courier New")
 
     def on_key_press(self, key, modifiers):
         """
@@ -412,11 +584,36 @@ class GameView(arcade.View):
             self.scroll_left = True
         elif key in[arcade.key.RIGHT, arcade.key.D]:
             self.scroll_right = True
+        elif key == arcade.key.P:
+            self.show_profile = self.profiler.enabled and not self.show_profile
+        elif key == arcade.key.T and self.profiler.enabled:
+            self.profiler.dump_json("profile_trace.json")
+        elif self.replay is not None:
+            self.control_replay(key)
        
             
     #aw
         
 
+    def control_replay(self, key):
+        """
+        ] and [ double and halve the playback speed, BACKSPACE reverses it,
+        and the period and comma keys seek forward and back.
+        """
+        world = self.world
+        if key == arcade.key.BRACKETRIGHT:
+            world.speed *= 2
+        elif key == arcade.key.BRACKETLEFT:
+            world.speed /= 2
+        elif key == arcade.key.BACKSPACE:
+            world.speed = -world.speed
+        elif key in (arcade.key.PERIOD, arcade.key.COMMA):
+            world.seek(world.tick + (REPLAY_SEEK if key == arcade.key.PERIOD else -REPLAY_SEEK))
+            # Anything may have changed, so rebuild the sprites from scratch
+            self.release_sprites()
+            self.animated_tick = None
+            self.visible_key = None
+
     def on_key_release(self, key, modifiers):
         """
         Called when the user releases a key.
@@ -432,32 +629,20 @@ class GameView(arcade.View):
 
 
 
-    def get_visible_coins(self, position, vision_radius):
-        visible_coins= []
-        if len(self.coin_list) > 0:
-            x,y = position
-            pos = np.array([[c.center_x,c.center_y] for c in self.coin_list])
-            dists = np.linalg.norm(pos - [x, y],axis=1)
-            visible_coins = np.arange(len(self.coin_list))
-            if vision_radius > 0:
-                visible_coins = visible_coins[dists <= vision_radius]
-
-        return visible_coins
-
-
-
     def on_update(self, delta_time):
         """ Movement and game logic """
 
-        self.coin_list.update()
-        self.coin_list.update_animation()
-        self.player_list.on_update(delta_time)
-        self.player_list.update_animation()
-
-        
+        if self.world.done and self.replay is None:
+            game_over_view = GameOverView(self.config)
+            game_over_view.time_taken = self.world.time
+            game_over_view.score = self.world.score
+            self.window.set_mouse_visible(True)
+            self.window.show_view(game_over_view)
+            return
 
+        with self.profiler.phase("step"):
+            self.stepper.advance(delta_time)
 
-        width, height = self.window.get_size()
         if self.scroll_up ^ self.scroll_down:
             self.view_bottom += SCROLL_SPEED*(self.scroll_up - self.scroll_down)
 
@@ -470,46 +655,8 @@ class GameView(arcade.View):
                             self.view_bottom,
                             self.viewport_height + self.view_bottom)
 
-
-
-        # Generate a list of all sprites that collided with the player.
-        if len(self.coin_list) > 0:
-
-            
-            self.counter = (self.counter + 1) % 20
-            hit_list = []
-            for player in self.player_list:
-                hit_list += arcade.check_for_collision_with_list(player, self.coin_list)
-            
-            for coin in hit_list:
-                coin.remove_from_sprite_lists()
-                print(coin in self.coin_list)
-                self.score += 1
-
-            self.time_taken += delta_time
-
-            # Call update on all sprites (The sprites don't do much in this
-            # example though.)
-            self.coin_list.update()
-            self.player_list.update()
-
-            # Generate a list of all sprites that collided with the player.
-            #hit_list = arcade.check_for_collision_with_list(self.player_sprite, self.coin_list)
-
-            # Loop through each colliding sprite, remove it, and add to the
-            # score.
-            #for coin in hit_list:
-            #    coin.kill()
-            #    self.score += 1
-            #    self.window.total_score += 1
-
-        
-        else:
-            game_over_view = GameOverView()
-            game_over_view.time_taken = self.time_taken
-            game_over_view.score = self.score
-            self.window.set_mouse_visible(True)
-            self.window.show_view(game_over_view)
+        with self.profiler.phase("cull"):
+            self.update_visible()
 
     '''
     def on_mouse_motion(self, x, y, _dx, _dy):
@@ -522,16 +669,44 @@ class GameView(arcade.View):
     '''
 
 
-def main():
+def main(config=None, profile=False, replay=None, trace=False):
     """ Main method """
     window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE,fullscreen=False, resizable=True)
     window.maximize()
     
-    gameview = GameView()
+    gameview = GameView(config, Profiler(trace=trace) if profile or trace else None, replay)
     gameview.setup()
     window.show_view(gameview)
     arcade.run()
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch a world, or play back a run recorded with recorder.py")
+    parser.add_argument("--seed", type=int, default=SimConfig.seed)
+    parser.add_argument("--players", type=int, default=SimConfig.player_count)
+    parser.add_argument("--coins", type=int, default=SimConfig.coin_count)
+    parser.add_argument("--predators", type=int, default=SimConfig.predator_count)
+    parser.add_argument("--vision", type=float, default=SimConfig.vision_radius)
+    parser.add_argument("--speed", type=float, default=SimConfig.movement_speed)
+    parser.add_argument("--max-ticks", type=int, default=SimConfig.max_ticks)
+    parser.add_argument("--pathfinding", action="store_true")
+    parser.add_argument("--flow-field", action="store_true")
+    parser.add_argument("--strategies", default=SimConfig.strategies,
+                        help="comma-separated foraging strategies, dealt out to the agents in turn")
+    parser.add_argument("--regrowth", action="store_true")
+    parser.add_argument("--lifecycle", action="store_true")
+    parser.add_argument("--terrain", default=None, help="Tiled map (.tmx) of the world's terrain")
+    parser.add_argument("--replay", default=None, help="directory of a recorded run to play back")
+    parser.add_argument("--profile", action="store_true", help="time the phases of each frame")
+    parser.add_argument("--trace", action="store_true", help="profile and keep a trace of every frame")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    config = SimConfig(seed=args.seed, player_count=args.players, coin_count=args.coins,
+                       predator_count=args.predators, vision_radius=args.vision, movement_speed=args.speed,
+                       max_ticks=args.max_ticks, pathfinding=args.pathfinding, flow_field=args.flow_field,
+                       strategies=args.strategies, regrowth=args.regrowth, lifecycle=args.lifecycle,
+                       terrain=args.terrain)
+    main(config, profile=args.profile, replay=args.replay, trace=args.trace)
@@ -0,0 +1,66 @@
+"""
+World physics stage
+
+Integrates every agent in one vectorized call.  The brick walls around the
+world are treated as analytic boundaries, so keeping agents inside them is
+a clamp rather than a collision check against each wall sprite.  Interior
+terrain is checked against the baked terrain bitmap, also in one lookup.
+"""
+import numpy as np
+
+
+class Physics():
+    def __init__(self, lower, upper, radius, friction=0.0, terrain=None):
+        """
+        lower and upper are the (x, y) corners of the walkable area, radius
+        the half-size of an agent's collision box, friction the fractional
+        change of velocity per tick and terrain an optional terrain.Terrain.
+        """
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.radius = float(radius)
+        self.friction = float(friction)
+        self.terrain = terrain
+
+    def blocked(self, positions, radius):
+        """
+        Mask of the positions whose box of half-size radius leaves the
+        walkable area.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        outside = np.any((positions - radius < self.lower) | (positions + radius > self.upper), axis=1)
+        if self.terrain is None:
+            return outside
+        return outside | self.terrain.blocked(positions, radius)
+
+    def step(self, positions, velocities):
+        """
+        Move positions one tick along velocities in place.
+
+        Agents that would cross a boundary are stopped against it and lose
+        the velocity component pointing into the wall.  Against terrain,
+        each axis of the move is undone for the agents it would take into a
+        blocked tile, so agents slide along obstacles.
+        """
+        if self.friction:
+            velocities *= 1 + self.friction
+        if self.terrain is None:
+            positions += velocities
+        else:
+            # Agents already overlapping terrain may move out of it
+            stuck = self.terrain.blocked(positions, self.radius)
+            for axis in (0, 1):
+                before = positions[:, axis].copy()
+                positions[:, axis] += velocities[:, axis]
+                hit = self.terrain.blocked(positions, self.radius) & ~stuck
+                positions[hit, axis] = before[hit]
+                velocities[hit, axis] = 0
+
+        low = self.lower + self.radius
+        high = self.upper - self.radius
+        below = positions < low
+        above = positions > high
+        np.clip(positions, low, high, out=positions)
+
+        velocities[below & (velocities < 0)] = 0
+        velocities[above & (velocities > 0)] = 0
@@ -0,0 +1,169 @@
+"""
+Structure-of-arrays agent store
+
+Agent kinematics live in contiguous NumPy arrays indexed by agent, so the
+world can update every agent in one vectorized pass instead of looping over
+per-agent objects.  Agents are slots of a preallocated pool, so births and
+deaths only flip flags.
+"""
+import numpy as np
+
+VISION_RADIUS = 350
+MOVEMENT_SPEED = 8
+ACCELERATION = 0.3
+WANDER_PERIOD = 15
+
+# Energy budget of an agent: what it is born with, what a food item is
+# worth, what it burns per tick at rest and per squared unit of speed, the
+# energy at which it splits into two and the age in ticks it dies at
+START_ENERGY = 100.0
+FOOD_ENERGY = 40.0
+BASAL_METABOLISM = 0.05
+MOVE_METABOLISM = 0.002
+BIRTH_ENERGY = 200.0
+MAX_AGE = 60 * 60 * 3
+
+# Predators: energy a caught herbivore is worth, top speed while chasing
+# prey, and how close a predator has to be for herbivores to run
+PREY_ENERGY = 80.0
+PREDATOR_SPEED = 10
+FLEE_RADIUS = 200
+
+# Number of character skins the renderer knows about
+SKIN_COUNT = 6
+
+# Foraging strategies, stored per agent as an index into this list
+# (see strategies.py)
+STRATEGIES = ["RANDOM", "NEAREST", "DENSITY", "GREEDY"]
+RANDOM = 0
+NEAREST = 1
+DENSITY = 2
+GREEDY = 3
+
+# Species, stored per agent as an index into this list.  Herbivores eat
+# food, predators hunt herbivores
+SPECIES = ["HERBIVORE", "PREDATOR"]
+HERBIVORE = 0
+PREDATOR = 1
+
+# Marks an agent without a target
+NO_TARGET = -1
+
+
+class AgentStore():
+    """
+    Agent state as arrays over a fixed number of slots.
+
+    The first count slots start out alive.  Dead agents free their slot and
+    births reuse freed slots, so the population can change without
+    reallocating arrays; slots that are not alive hold stale values and are
+    skipped by every per-tick update.
+    """
+    # Names of the per-slot arrays
+    FIELDS = ("positions", "velocities", "targets", "target_positions", "strategies", "counters",
+              "skins", "acceleration", "vision_radius", "food_eaten", "energy", "age", "species", "prey",
+              "alive")
+
+    def __init__(self, count, capacity=None):
+        capacity = max(count, capacity or count)
+        self.positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        # Food id each agent is heading for and where that food is
+        self.targets = np.full(capacity, NO_TARGET, dtype=np.int64)
+        self.target_positions = np.zeros((capacity, 2))
+        self.strategies = np.full(capacity, RANDOM, dtype=np.int8)
+        self.counters = np.zeros(capacity, dtype=np.int32)
+        self.skins = np.zeros(capacity, dtype=np.int8)
+        self.acceleration = np.full(capacity, ACCELERATION)
+        self.vision_radius = np.full(capacity, float(VISION_RADIUS))
+        self.food_eaten = np.zeros(capacity, dtype=np.int64)
+        self.energy = np.zeros(capacity)
+        # Ticks each agent has lived
+        self.age = np.zeros(capacity, dtype=np.int64)
+        self.species = np.full(capacity, HERBIVORE, dtype=np.int8)
+        # Slot of the herbivore each predator is chasing
+        self.prey = np.full(capacity, NO_TARGET, dtype=np.int64)
+
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[:count] = True
+        # Free slots; births take them from the end
+        self.free = list(range(capacity - 1, count - 1, -1))
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def count(self):
+        """
+        Number of living agents.
+        """
+        return len(self) - len(self.free)
+
+    @property
+    def has_target(self):
+        return self.targets != NO_TARGET
+
+    def set_targets(self, agents, food_ids, food_positions):
+        self.targets[agents] = food_ids
+        self.target_positions[agents] = food_positions
+
+    def clear_targets(self, agents):
+        self.targets[agents] = NO_TARGET
+
+    def spawn(self, count):
+        """
+        Bring up to count agents to life in free slots, reset to a fresh
+        state; returns their slots.  The caller fills in their position and
+        traits.
+        """
+        slots = np.array([self.free.pop() for _ in range(min(count, len(self.free)))], dtype=np.int64)
+        self.alive[slots] = True
+        self.velocities[slots] = 0.0
+        self.targets[slots] = NO_TARGET
+        self.prey[slots] = NO_TARGET
+        self.counters[slots] = 0
+        self.food_eaten[slots] = 0
+        self.energy[slots] = 0.0
+        self.age[slots] = 0
+        return slots
+
+    def kill(self, agents):
+        agents = np.asarray(agents, dtype=np.int64).reshape(-1)
+        agents = agents[self.alive[agents]]
+        self.alive[agents] = False
+        self.velocities[agents] = 0.0
+        self.targets[agents] = NO_TARGET
+        self.prey[agents] = NO_TARGET
+        self.free.extend(sorted(agents.tolist(), reverse=True))
+
+
+def steer(velocities, directions, acceleration, max_speed):
+    """
+    Accelerate velocities towards unit directions.
+
+    The acceleration is the sum of a radial term along the direction and a
+    corrective term that cancels the part of the heading pointing elsewhere,
+    rescaled to the agent's acceleration, and the result is clipped to
+    max_speed.  All arguments are arrays over the same set of agents.
+    """
+    speed = np.linalg.norm(velocities, axis=1, keepdims=True)
+    heading = np.divide(velocities, speed, out=np.zeros_like(velocities), where=speed > 0)
+
+    acc = 2 * directions - heading
+    acc[speed[:, 0] == 0] = directions[speed[:, 0] == 0]
+    norm = np.linalg.norm(acc, axis=1, keepdims=True)
+    acc = np.divide(acc, norm, out=np.zeros_like(acc), where=norm > 0)
+
+    v = velocities + acceleration[:, None] * acc
+
+    speed = np.linalg.norm(v, axis=1, keepdims=True)
+    scale = np.minimum(1.0, np.divide(max_speed, speed, out=np.ones_like(speed), where=speed > 0))
+    return v * scale
+
+
+def unit_vectors(vectors):
+    """
+    Normalize the rows of vectors, leaving zero rows at zero.
+    """
+    norm = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norm, out=np.zeros_like(vectors), where=norm > 0)
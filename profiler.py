@@ -0,0 +1,130 @@
+"""
+Per-phase profiler
+
+Times named phases of a tick or frame with perf_counter_ns, keeps the last
+samples of every phase for rolling p50/p95/p99, and can keep a trace of
+the most recent samples to dump as CSV or JSON for offline analysis.
+
+Code under measurement always goes through a profiler:
+
+    with self.profiler.phase("physics"):
+        ...
+
+NULL_PROFILER is the default and its phase() hands back a shared no-op
+context manager, so leaving instrumentation in costs next to nothing.
+"""
+from collections import deque
+from contextlib import nullcontext
+import csv
+import json
+from time import perf_counter_ns
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+# Samples a trace keeps by default, about an hour of a few phases at 60 Hz
+TRACE_LIMIT = 1 << 20
+
+
+class _Phase():
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, perf_counter_ns() - self.start)
+
+
+class Profiler():
+    enabled = True
+
+    def __init__(self, window=600, trace=False, trace_limit=TRACE_LIMIT):
+        """
+        window is how many recent samples per phase the percentiles cover;
+        with trace, the last trace_limit samples are also kept for
+        dump_csv/dump_json, or every sample when trace_limit is None.
+        """
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.phases = {}
+        self.trace = deque(maxlen=trace_limit) if trace else None
+        # Tick or frame number that samples are attributed to in the trace
+        self.frame = 0
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+        return phase
+
+    def record(self, name, ns):
+        buffer = self.samples.get(name)
+        if buffer is None:
+            buffer = self.samples[name] = np.zeros(self.window, dtype=np.int64)
+            self.counts[name] = 0
+        buffer[self.counts[name] % self.window] = ns
+        self.counts[name] += 1
+        if self.trace is not None:
+            self.trace.append((self.frame, name, ns))
+
+    def percentiles(self, name):
+        """
+        Rolling p50/p95/p99 of a phase in milliseconds.
+        """
+        filled = self.samples[name][:min(self.counts[name], self.window)]
+        values = np.percentile(filled, PERCENTILES) / 1e6
+        return {f"p{p}": float(v) for p, v in zip(PERCENTILES, values)}
+
+    def summary(self):
+        return {name: self.percentiles(name) for name in self.samples}
+
+    def lines(self):
+        """
+        One text line per phase, for an on-screen overlay.
+        """
+        return [f"{name:<10} " + " ".join(f"{k} {v:6.2f}" for k, v in stats.items()) + " ms"
+                for name, stats in self.summary().items()]
+
+    def dump_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "phase", "ns"])
+            writer.writerows(self.trace or [])
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(),
+                       "trace": [{"frame": frame, "phase": name, "ns": ns}
+                                 for frame, name, ns in self.trace or []]}, f)
+
+
+class NullProfiler():
+    enabled = False
+    frame = 0
+
+    def __init__(self):
+        self._phase = nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def record(self, name, ns):
+        pass
+
+    def summary(self):
+        return {}
+
+    def lines(self):
+        return []
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,360 @@
+"""
+Trajectory recording and replay
+
+TrajectoryRecorder streams a run to a directory of compressed chunks, one
+np.savez_compressed file per CHUNK_TICKS ticks, plus a manifest.json
+listing them.  A chunk holds per-tick columns for the agents (position,
+target, liveness, skin, species, vision radius) and for the food a
+keyframe of everything alive at the chunk's first tick and the food eaten
+and grown after it.  Only the chunk being filled is held in memory, and chunks are
+compressed and written on a background thread.
+
+TrajectoryReader seeks to any recorded tick, and ReplayWorld dresses the
+reader up as the world GameView renders, so a recorded run can be
+watched at any speed without simulating it again:
+
+    with TrajectoryRecorder("runs/seed0") as recorder:
+        world.setup()
+        recorder.record(world)
+        while not world.done:
+            world.step()
+            recorder.record(world)
+
+    python recorder.py runs/seed0 --seed 0 --players 64 --regrowth
+    python game.py --replay runs/seed0
+"""
+import argparse
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+
+import numpy as np
+
+from config import SimConfig
+from population import AgentStore
+from profiler import NULL_PROFILER
+from terrain import load as load_terrain
+from world import World
+
+VERSION = 2
+CHUNK_TICKS = 600
+MANIFEST = "manifest.json"
+
+# Per-tick agent columns and the dtype they are stored as
+AGENT_COLUMNS = {"positions": np.float32, "targets": np.int32, "alive": bool,
+                 "skins": np.int8, "species": np.int8, "vision_radius": np.float32}
+
+
+class TrajectoryRecorder():
+    def __init__(self, directory, chunk_ticks=CHUNK_TICKS):
+        self.directory = directory
+        self.chunk_ticks = chunk_ticks
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self._start_chunk()
+
+    def _start_chunk(self):
+        self.ticks = []
+        self.times = []
+        self.scores = []
+        self.columns = {name: [] for name in AGENT_COLUMNS}
+        self.keyframe = None
+        self.events = {"eaten": [], "grown": [], "grown_positions": [], "born": []}
+
+    def record(self, world):
+        """
+        Record the world as it is now; call after setup and every step.
+        """
+        if self.manifest is None:
+            self.manifest = {"version": VERSION, "config": world.config.to_dict(),
+                             "agent_capacity": len(world.agents), "chunks": []}
+        if self.keyframe is None:
+            self.keyframe = (world.food_ids.copy(), world.food_positions)
+
+        tick = world.tick
+        self.ticks.append(tick)
+        self.times.append(world.time)
+        self.scores.append(world.score)
+        for name, dtype in AGENT_COLUMNS.items():
+            self.columns[name].append(getattr(world.agents, name).astype(dtype))
+
+        events = self.events
+        events["eaten"].extend((tick, food_id) for food_id in world.eaten)
+        events["grown"].extend((tick, food_id) for food_id in world.grown)
+        if world.grown:
+            events["grown_positions"].append(world.food.positions[world.grown])
+        events["born"].extend((tick, slot) for slot in world.born)
+
+        if len(self.ticks) >= self.chunk_ticks:
+            self.flush()
+
+    def flush(self):
+        """
+        Hand the chunk being filled to the writer thread.
+        """
+        if not self.ticks:
+            return
+        events = self.events
+        arrays = {"ticks": np.array(self.ticks, dtype=np.int64),
+                  "times": np.array(self.times),
+                  "scores": np.array(self.scores, dtype=np.int64),
+                  "keyframe_ids": self.keyframe[0],
+                  "keyframe_positions": self.keyframe[1]}
+        for name in AGENT_COLUMNS:
+            arrays[name] = np.stack(self.columns[name])
+        for name in ("eaten", "grown", "born"):
+            pairs = np.array(events[name], dtype=np.int64).reshape(-1, 2)
+            arrays[f"{name}_ticks"] = pairs[:, 0]
+            arrays[f"{name}_ids"] = pairs[:, 1]
+        arrays["grown_positions"] = (np.concatenate(events["grown_positions"])
+                                     if events["grown_positions"] else np.zeros((0, 2)))
+
+        # Every food id of the chunk is in the keyframe or grew later
+        food_capacity = 1 + max(arrays["keyframe_ids"].max(initial=-1), arrays["grown_ids"].max(initial=-1))
+        name = f"chunk_{len(self.manifest['chunks']):06d}.npz"
+        self.manifest["chunks"].append({"file": name, "first_tick": self.ticks[0], "last_tick": self.ticks[-1],
+                                        "food_capacity": int(food_capacity)})
+        manifest = json.dumps(self.manifest, indent=1)
+
+        # At most one chunk waits for the writer, which bounds memory
+        if self.pending is not None:
+            self.pending.result()
+        self.pending = self.executor.submit(self._write, name, arrays, manifest)
+        self._start_chunk()
+
+    def _write(self, name, arrays, manifest):
+        np.savez_compressed(os.path.join(self.directory, name), **arrays)
+        # The manifest only lists chunks that are fully written
+        path = os.path.join(self.directory, MANIFEST)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(manifest)
+        os.replace(f"{path}.tmp", path)
+
+    def close(self):
+        self.flush()
+        if self.pending is not None:
+            self.pending.result()
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader():
+    """
+    Random access to the ticks of a recorded run, one chunk in memory at a
+    time.  Reading forward applies only the food events since the last
+    read; seeking elsewhere replays them from the chunk's keyframe.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != VERSION:
+            raise ValueError(f"{directory} has recording format {self.manifest['version']}, expected {VERSION}")
+        self.chunks = self.manifest["chunks"]
+        self.starts = [chunk["first_tick"] for chunk in self.chunks]
+        self.first_tick = self.starts[0]
+        self.last_tick = self.chunks[-1]["last_tick"]
+
+        capacity = max(chunk["food_capacity"] for chunk in self.chunks)
+        self.food_alive = np.zeros(capacity, dtype=bool)
+        self.food_positions = np.zeros((capacity, 2))
+        self.chunk = None
+        self.chunk_index = None
+        # Tick the food state currently reflects
+        self.food_tick = None
+
+    @property
+    def config(self):
+        return SimConfig(**self.manifest["config"])
+
+    def load_chunk(self, index):
+        if index != self.chunk_index:
+            with np.load(os.path.join(self.directory, self.chunks[index]["file"])) as data:
+                self.chunk = {name: data[name] for name in data.files}
+            self.chunk_index = index
+            self.food_tick = None
+        return self.chunk
+
+    def frame(self, tick):
+        """
+        The recorded state at tick, clamped to the recording: a dict of the
+        per-tick agent columns plus tick, time and score, and the ids of
+        the food eaten since the previous frame read, or None when that
+        frame was not earlier in the same chunk.
+        """
+        tick = int(np.clip(tick, self.first_tick, self.last_tick))
+        chunk = self.load_chunk(bisect_right(self.starts, tick) - 1)
+        row = int(np.searchsorted(chunk["ticks"], tick))
+        frame = {name: chunk[name][row] for name in AGENT_COLUMNS}
+        frame["tick"] = tick
+        frame["time"] = float(chunk["times"][row])
+        frame["score"] = int(chunk["scores"][row])
+        frame["eaten"] = self.advance_food(chunk, tick)
+        return frame
+
+    def advance_food(self, chunk, tick):
+        """
+        Bring the food state to tick and return the ids eaten on the way.
+        """
+        first = int(chunk["ticks"][0])
+        if self.food_tick is None or tick < self.food_tick:
+            self.food_alive[:] = False
+            self.food_alive[chunk["keyframe_ids"]] = True
+            self.food_positions[chunk["keyframe_ids"]] = chunk["keyframe_positions"]
+            self.food_tick = first
+            since = None
+        else:
+            since = self.food_tick
+
+        # Every eaten and grown event in (food_tick, tick], ordered by tick
+        # with eating before growing as in World.step; the last event of an
+        # id decides whether it is alive
+        lo, hi = self.food_tick, tick
+        eaten = slice(*np.searchsorted(chunk["eaten_ticks"], [lo, hi], side="right"))
+        grown = slice(*np.searchsorted(chunk["grown_ticks"], [lo, hi], side="right"))
+        self.food_tick = tick
+
+        ids = np.r_[chunk["eaten_ids"][eaten], chunk["grown_ids"][grown]]
+        keys = np.r_[2 * chunk["eaten_ticks"][eaten], 2 * chunk["grown_ticks"][grown] + 1]
+        order = np.argsort(keys, kind="stable")[::-1]
+        last_ids, last = np.unique(ids[order], return_index=True)
+        last = order[last]
+        is_grown = last >= eaten.stop - eaten.start
+        self.food_alive[last_ids] = is_grown
+        grown_rows = last[is_grown] - (eaten.stop - eaten.start)
+        self.food_positions[last_ids[is_grown]] = chunk["grown_positions"][grown.start + grown_rows]
+
+        if since is None:
+            return None
+        return chunk["eaten_ids"][eaten].tolist()
+
+
+class _ReplayFood():
+    def __init__(self, reader):
+        self.positions = reader.food_positions
+        self.ids = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ReplayWorld():
+    """
+    A recorded run that GameView can render in place of a World.
+
+    step() moves speed ticks through the recording instead of simulating;
+    speed may be fractional or negative, and seek() jumps to any tick.
+    """
+    def __init__(self, reader, speed=1.0):
+        self.reader = reader
+        self.config = reader.config
+        self.speed = speed
+        self.profiler = NULL_PROFILER
+        self.walls = World(self.config).build_walls()
+        self.terrain = load_terrain(self.config.terrain) if self.config.terrain else None
+        self.agents = AgentStore(0, reader.manifest["agent_capacity"])
+        self.food = _ReplayFood(reader)
+        self.eaten = []
+        self.born = []
+        self.score = 0
+        self.time = 0.0
+        self.tick = None
+        # Fraction of a tick carried over between steps
+        self.carry = 0.0
+        self.seek(reader.first_tick)
+
+    @property
+    def done(self):
+        return self.speed > 0 and self.tick >= self.reader.last_tick
+
+    @property
+    def food_ids(self):
+        return self.food.ids
+
+    @property
+    def food_positions(self):
+        return self.food.positions[self.food.ids]
+
+    def setup(self):
+        pass
+
+    def seek(self, tick):
+        previous = self.tick
+        frame = self.reader.frame(tick)
+        agents = self.agents
+        old_positions = agents.positions.copy()
+        old_alive = agents.alive.copy()
+        for name in AGENT_COLUMNS:
+            getattr(agents, name)[:] = frame[name]
+        agents.free = np.flatnonzero(~agents.alive).tolist()
+
+        # Velocities for the renderer's facing and walk cycle
+        ticks = 0 if previous is None else frame["tick"] - previous
+        if ticks > 0:
+            agents.velocities[:] = (agents.positions - old_positions) / ticks
+            agents.velocities[~(old_alive & agents.alive)] = 0.0
+        else:
+            agents.velocities[:] = 0.0
+
+        # Food eaten and slots reborn since the last frame, so the renderer
+        # drops or rebinds their sprites.  After a jump anything may have
+        # changed, so every sprite is refreshed
+        if frame["eaten"] is None:
+            self.eaten = self.food.ids.tolist()
+            self.born = list(range(len(agents)))
+        else:
+            self.eaten = frame["eaten"]
+            born = self.reader.chunk["born_ticks"]
+            span = slice(*np.searchsorted(born, [previous, frame["tick"]], side="right"))
+            self.born = self.reader.chunk["born_ids"][span].tolist()
+        self.food.ids = np.flatnonzero(self.reader.food_alive)
+        self.tick = frame["tick"]
+        self.time = frame["time"]
+        self.score = frame["score"]
+
+    def step(self, dt=None):
+        self.carry += self.speed
+        ticks = int(self.carry)
+        self.carry -= ticks
+        if ticks:
+            self.seek(self.tick + ticks)
+        else:
+            self.eaten = []
+            self.born = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a headless run for replay with game.py --replay")
+    parser.add_argument("directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=SimConfig.player_count)
+    parser.add_argument("--coins", type=int, default=SimConfig.coin_count)
+    parser.add_argument("--predators", type=int, default=SimConfig.predator_count)
+    parser.add_argument("--max-ticks", type=int, default=SimConfig.max_ticks)
+    parser.add_argument("--regrowth", action="store_true")
+    parser.add_argument("--lifecycle", action="store_true")
+    parser.add_argument("--chunk-ticks", type=int, default=CHUNK_TICKS)
+    args = parser.parse_args()
+
+    world = World(seed=args.seed, player_count=args.players, coin_count=args.coins,
+                  predator_count=args.predators, max_ticks=args.max_ticks, regrowth=args.regrowth,
+                  lifecycle=args.lifecycle)
+    with TrajectoryRecorder(args.directory, args.chunk_ticks) as recorder:
+        world.setup()
+        recorder.record(world)
+        while not world.done and world.tick < args.max_ticks:
+            world.step()
+            recorder.record(world)
+    print(f"recorded {world.tick} ticks to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
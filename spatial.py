@@ -0,0 +1,235 @@
+"""
+Spatial indices over world positions
+
+FoodGrid buckets food into square cells so radius queries only look at the
+cells a query circle overlaps, instead of measuring the distance to every
+food item in the world.  CellList does the same for points that change
+too often to update in place, such as moving agents, by rebuilding its
+cells from scratch.
+"""
+import numpy as np
+
+# Largest point-by-candidate distance matrix built at once in batch queries
+BATCH_ELEMENTS = 1 << 20
+
+
+class FoodGrid():
+    """
+    Uniform grid over food positions with incremental insert and remove.
+
+    Each cell maps food id -> position.  NumPy views of a cell are built on
+    demand and cached until the cell changes, so queries on a static region
+    do not rebuild arrays.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._arrays = {}
+        self._cell_of = {}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def __contains__(self, food_id):
+        return food_id in self._cell_of
+
+    def ids(self):
+        """
+        Ids of all the food, each cell's in the order queries return them;
+        inserting them again in this order rebuilds an identical grid.
+        """
+        ids = [food_id for bucket in self._cells.values() for food_id in bucket]
+        return np.array(ids, dtype=np.int64)
+
+    def insert(self, ids, positions):
+        """
+        Add food items, grouping them by cell so bulk inserts stay cheap.
+        """
+        ids = np.asarray(ids).reshape(-1)
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        if len(ids) == 0:
+            return
+
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        cells = cells[order]
+        ids = ids[order]
+        positions = positions[order]
+
+        starts = np.flatnonzero(np.any(np.diff(cells, axis=0) != 0, axis=1)) + 1
+        for group in np.split(np.arange(len(ids)), starts):
+            key = (int(cells[group[0], 0]), int(cells[group[0], 1]))
+            bucket = self._cells.setdefault(key, {})
+            for food_id, position in zip(ids[group].tolist(), positions[group].tolist()):
+                bucket[food_id] = position
+                self._cell_of[food_id] = key
+            self._arrays.pop(key, None)
+
+    def remove(self, ids):
+        for food_id in np.asarray(ids).reshape(-1).tolist():
+            key = self._cell_of.pop(food_id, None)
+            if key is None:
+                continue
+            bucket = self._cells[key]
+            del bucket[food_id]
+            if not bucket:
+                del self._cells[key]
+            self._arrays.pop(key, None)
+
+    def _cell_arrays(self, key):
+        arrays = self._arrays.get(key)
+        if arrays is None:
+            bucket = self._cells[key]
+            ids = np.fromiter(bucket.keys(), dtype=np.int64, count=len(bucket))
+            positions = np.array(list(bucket.values()), dtype=float).reshape(-1, 2)
+            arrays = self._arrays[key] = (ids, positions)
+        return arrays
+
+    def _gather(self, cx, cy, reach):
+        """
+        Ids and positions of the food in the cells within reach of (cx, cy).
+        """
+        ids = []
+        positions = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                if (x, y) in self._cells:
+                    cell_ids, cell_positions = self._cell_arrays((x, y))
+                    ids.append(cell_ids)
+                    positions.append(cell_positions)
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+        return np.concatenate(ids), np.concatenate(positions)
+
+    def query_radius_batch(self, points, radii):
+        """
+        Radius queries for many points at once.
+
+        Points sharing a cell share one candidate gather, so the Python work
+        scales with the number of occupied cells rather than points.  Returns
+        flat (rows, ids, positions) arrays with one entry per (point, food)
+        pair in range, rows indexing into points and sorted ascending.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(points),))
+
+        rows = []
+        ids = []
+        positions = []
+        if len(points) > 0 and self._cells:
+            cells = np.floor(points / self.cell_size).astype(np.int64)
+            # Pack each cell into one integer so points can be grouped by a 1-D sort
+            packed = (cells[:, 0] << 32) + (cells[:, 1] & 0xFFFFFFFF)
+            order = np.argsort(packed, kind="stable")
+            starts = np.flatnonzero(np.r_[True, packed[order][1:] != packed[order][:-1]])
+            bounds = np.r_[starts, len(order)]
+
+            for k in range(len(starts)):
+                members = order[bounds[k]:bounds[k + 1]]
+                cx, cy = cells[members[0]].tolist()
+                reach = int(np.ceil(radii[members].max() / self.cell_size))
+                cand_ids, cand_positions = self._gather(cx, cy, reach)
+                if len(cand_ids) == 0:
+                    continue
+
+                # Bound the distance matrix of crowded cells by chunking
+                chunk = max(1, BATCH_ELEMENTS // len(cand_ids))
+                for lo in range(0, len(members), chunk):
+                    part = members[lo:lo + chunk]
+                    d2 = np.sum((points[part, None, :] - cand_positions[None, :, :]) ** 2, axis=2)
+                    hit_rows, hit_cols = np.nonzero(d2 <= radii[part, None] ** 2)
+                    rows.append(part[hit_rows])
+                    ids.append(cand_ids[hit_cols])
+                    positions.append(cand_positions[hit_cols])
+
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+
+        rows = np.concatenate(rows)
+        order = np.argsort(rows, kind="stable")
+        return rows[order], np.concatenate(ids)[order], np.concatenate(positions)[order]
+
+
+class CellList():
+    """
+    Cell list over integer ids at positions, rebuilt rather than updated.
+
+    build() sorts the ids by cell and counts them per cell, so every cell
+    is a contiguous run of one id array starting at starts[cell].  Radius
+    queries expand the runs of the cells around every query point with
+    array arithmetic, so they cost in proportion to the nearby pairs
+    rather than the square of the population, with no Python loop over
+    points or cells.
+    """
+    def __init__(self, lower, upper, cell_size):
+        """
+        lower and upper are the corners of the area the points can be in;
+        points outside it are counted in the nearest edge cell.
+        """
+        self.lower = np.asarray(lower, dtype=float)
+        self.cell_size = float(cell_size)
+        size = np.asarray(upper, dtype=float) - self.lower
+        self.cols, self.rows = np.maximum(np.ceil(size / self.cell_size), 1).astype(np.int64).tolist()
+        self.starts = np.zeros(self.cols * self.rows + 1, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def cells(self, positions):
+        """
+        (col, row) of the cells holding positions.
+        """
+        ij = np.floor((positions - self.lower) / self.cell_size).astype(np.int64)
+        return np.clip(ij, 0, [self.cols - 1, self.rows - 1])
+
+    def build(self, ids, positions):
+        """
+        Index ids at positions, replacing whatever was indexed before.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        ij = self.cells(positions)
+        cells = ij[:, 0] + ij[:, 1] * self.cols
+        counts = np.bincount(cells, minlength=self.cols * self.rows)
+        self.starts = np.r_[0, np.cumsum(counts)]
+        order = np.argsort(cells, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.positions = positions[order]
+
+    def query_radius_batch(self, points, radii):
+        """
+        Radius queries for many points at once, as FoodGrid's: flat (rows,
+        ids, positions) arrays with one entry per (point, indexed id) pair
+        in range, rows indexing into points and sorted ascending.  An agent
+        queried at its own position finds itself.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(points),))
+        if len(points) == 0 or len(self.ids) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros((0, 2))
+
+        ij = self.cells(points)
+        reach = int(np.ceil(radii.max() / self.cell_size))
+        rows = []
+        members = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                x = ij[:, 0] + dx
+                y = ij[:, 1] + dy
+                queried = np.flatnonzero((x >= 0) & (x < self.cols) & (y >= 0) & (y < self.rows))
+                cells = x[queried] + y[queried] * self.cols
+                first = self.starts[cells]
+                counts = self.starts[cells + 1] - first
+                # Every member of every cell, paired with its query point
+                ends = np.cumsum(counts)
+                rows.append(np.repeat(queried, counts))
+                members.append(np.repeat(first - ends + counts, counts) + np.arange(ends[-1] if len(ends) else 0))
+
+        rows = np.concatenate(rows)
+        members = np.concatenate(members)
+        positions = self.positions[members]
+        inside = np.sum((positions - points[rows]) ** 2, axis=1) <= radii[rows] ** 2
+        rows = rows[inside]
+        order = np.argsort(rows, kind="stable")
+        return rows[order], self.ids[members[inside]][order], positions[inside][order]
@@ -0,0 +1,139 @@
+"""
+Foraging strategies
+
+A strategy picks a target for a whole batch of agents at once.  It is
+called as
+
+    choose(world, agents, rows, ids, positions)
+
+where agents are the store slots of the batch and (rows, ids, positions)
+are the visible (agent, food) pairs from FoodGrid.query_radius_batch, rows
+indexing into agents and sorted ascending.  It returns the index of the
+chosen pair of every row that has one.  Each agent carries a strategy code
+indexing STRATEGIES, so mixed populations run every strategy on its own
+slice of the pairs without per-agent dispatch.  register() adds new ones.
+"""
+import numpy as np
+
+from population import STRATEGIES
+
+# Food is counted per square of this size when seeking dense clusters
+DENSITY_CELL = 128
+
+# Rounds of resolving agents of a batch that picked the same food before
+# the remaining ones settle for their best pick regardless
+CONTENTION_ROUNDS = 3
+
+
+def first_per_row(order, rows):
+    """
+    Indices into order of the first pair of every row, for an order that
+    sorts the pairs by row first.
+    """
+    rows = rows[order]
+    return order[np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])]
+
+
+def distances(world, agents, rows, positions):
+    """
+    Squared distance of every pair.
+    """
+    return np.sum((world.agents.positions[agents[rows]] - positions) ** 2, axis=1)
+
+
+def choose_random(world, agents, rows, ids, positions):
+    """
+    Any visible food: give every pair a random key and keep the smallest.
+    """
+    return first_per_row(np.lexsort((world.rng.random(len(rows)), rows)), rows)
+
+
+def choose_nearest(world, agents, rows, ids, positions):
+    return first_per_row(np.lexsort((distances(world, agents, rows, positions), rows)), rows)
+
+
+def choose_density(world, agents, rows, ids, positions):
+    """
+    The nearest food in the square holding the most visible food, so
+    agents head for clusters rather than strays.
+    """
+    cells = np.floor(positions / DENSITY_CELL).astype(np.int64)
+    packed = (cells[:, 0] << 32) + (cells[:, 1] & 0xFFFFFFFF)
+    order = np.lexsort((packed, rows))
+    starts = np.flatnonzero(np.r_[True, (rows[order][1:] != rows[order][:-1]) |
+                                  (packed[order][1:] != packed[order][:-1])])
+    counts = np.empty(len(rows), dtype=np.int64)
+    counts[order] = np.repeat(np.diff(np.r_[starts, len(order)]), np.diff(np.r_[starts, len(order)]))
+    return first_per_row(np.lexsort((distances(world, agents, rows, positions), -counts, rows)), rows)
+
+
+def choose_greedy(world, agents, rows, ids, positions):
+    """
+    The nearest food that nobody else is after.
+
+    Food already targeted by agents outside the batch is only picked when
+    nothing else is visible.  Within the batch, agents that pick the same
+    food are resolved in rounds: the closest keeps it and the others pick
+    again from what is left.
+    """
+    store = world.agents
+    claimed = np.zeros(world.food.capacity, dtype=bool)
+    others = np.ones(len(store), dtype=bool)
+    others[agents] = False
+    claimed[store.targets[others & store.has_target]] = True
+
+    d2 = distances(world, agents, rows, positions)
+    by_preference = np.lexsort((d2, claimed[ids], rows))
+    open_pairs = np.ones(len(rows), dtype=bool)
+    settled = np.zeros(len(agents), dtype=bool)
+    taken = np.zeros(world.food.capacity, dtype=bool)
+    chosen = []
+
+    for _ in range(CONTENTION_ROUNDS):
+        order = by_preference[open_pairs[by_preference]]
+        if len(order) == 0:
+            break
+        picks = first_per_row(order, rows)
+        # The closest agent, then the lowest row, wins each contested food
+        contest = np.lexsort((rows[picks], d2[picks], ids[picks]))
+        contest_ids = ids[picks][contest]
+        winners = picks[contest[np.flatnonzero(np.r_[True, contest_ids[1:] != contest_ids[:-1]])]]
+        chosen.append(winners)
+        settled[rows[winners]] = True
+        taken[ids[winners]] = True
+        open_pairs &= ~settled[rows] & ~taken[ids]
+
+    # Agents still contending take their best remaining pick, or failing
+    # that their best pick overall
+    pending = np.flatnonzero(~settled[rows])
+    if len(pending) > 0:
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[by_preference] = np.arange(len(rows))
+        order = pending[np.lexsort((rank[pending], ~open_pairs[pending], rows[pending]))]
+        chosen.append(first_per_row(order, rows))
+    return np.sort(np.concatenate(chosen)) if chosen else np.zeros(0, dtype=np.int64)
+
+
+CHOOSERS = [choose_random, choose_nearest, choose_density, choose_greedy]
+
+
+def register(name, choose):
+    """
+    Add a strategy; returns the code agents use to pick it.
+    """
+    STRATEGIES.append(name)
+    CHOOSERS.append(choose)
+    return len(STRATEGIES) - 1
+
+
+def codes(names):
+    """
+    Strategy codes of a comma-separated string of strategy names.
+    """
+    result = []
+    for name in names.split(","):
+        name = name.strip().upper()
+        if name not in STRATEGIES:
+            raise ValueError(f"unknown strategy {name}, expected one of {', '.join(STRATEGIES)}")
+        result.append(STRATEGIES.index(name))
+    return np.array(result, dtype=np.int8)
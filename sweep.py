@@ -0,0 +1,132 @@
+"""
+Parameter sweeps
+
+Expands a grid or random search over SimConfig fields into runs and feeds
+them through one long-lived process pool.  Workers import the simulation
+once when the pool starts and are reused for every batch, so a sweep pays
+process startup once rather than once per run.  Runs are submitted most
+expensive first so a long run does not end up alone at the tail.
+
+    python sweep.py --grid player_count=4,16,64 vision_radius=200,350 --repeats 4 > sweep.jsonl
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from config import SimConfig
+from ensemble import run_ensemble
+
+
+def grid(base=None, repeats=1, **axes):
+    """
+    Configs for every combination of the values in axes, each repeated
+    with consecutive seeds.
+    """
+    base = base or SimConfig()
+    names = list(axes)
+    runs = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        config = base.replace(**dict(zip(names, values)))
+        runs.extend(config.replace(seed=(base.seed or 0) + r) for r in range(repeats))
+    return runs
+
+
+def random_search(space, count, base=None, seed=0):
+    """
+    count configs with fields drawn from space.  A (low, high) tuple is
+    sampled uniformly, as an integer when both ends are integers; a list is
+    sampled as a choice of its items.
+    """
+    base = base or SimConfig()
+    rng = np.random.default_rng(seed)
+    runs = []
+    for i in range(count):
+        changes = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    changes[name] = int(rng.integers(low, high + 1))
+                else:
+                    changes[name] = float(rng.uniform(low, high))
+            else:
+                changes[name] = values[rng.integers(len(values))]
+        runs.append(base.replace(seed=seed + i, **changes))
+    return runs
+
+
+def cost(config):
+    """
+    Rough relative cost of a run, used to schedule the largest runs first.
+    """
+    return config.max_ticks * (config.player_count + 0.01 * config.coin_count)
+
+
+def _warm_up():
+    # Import the simulation and run a tiny world so the first real run in
+    # this worker does not pay for imports and first-call overheads
+    from world import World
+    world = World(player_count=1, coin_count=1, max_ticks=1)
+    world.setup()
+    world.run()
+
+
+class Sweep():
+    """
+    A warm worker pool that runs batches of configs, largest first.
+
+        with Sweep(workers=8) as sweep:
+            for summary in sweep.run(grid(player_count=[4, 16, 64])):
+                ...
+    """
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.pool = None
+
+    def __enter__(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown()
+        self.pool = None
+
+    def run(self, runs):
+        runs = sorted(runs, key=cost, reverse=True)
+        return run_ensemble(runs, pool=self.pool)
+
+
+def _parse_axis(text):
+    name, _, values = text.partition("=")
+    kind = SimConfig.__dataclass_fields__[name].type
+    if kind is bool:
+        return name, [v.lower() in ("1", "true", "yes") for v in values.split(",")]
+    return name, [kind(v) for v in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", nargs="+", default=[], metavar="FIELD=V1,V2",
+                        help="SimConfig field and the values to sweep it over")
+    parser.add_argument("--repeats", type=int, default=1, help="seeds per grid point")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-ticks", type=int, default=SimConfig.max_ticks)
+    args = parser.parse_args()
+
+    axes = dict(_parse_axis(axis) for axis in args.grid)
+    runs = grid(SimConfig(max_ticks=args.max_ticks), args.repeats, **axes)
+
+    start = time.perf_counter()
+    with Sweep(args.workers) as sweep:
+        for summary in sweep.run(runs):
+            print(json.dumps(summary), flush=True)
+    print(f"{len(runs)} runs in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Tilemap terrain
+
+Loads the static geometry of a world from a Tiled map and bakes it into an
+occupancy bitmap with one byte per map tile, so checking agents against
+terrain is an array lookup rather than a sprite collision.  Layers are
+picked by name:
+
+    obstacles   walls and rocks agents cannot enter
+    water       impassable for agents, and nothing grows in it
+    fertile     food grows back FERTILE_BOOST times as densely
+
+Tile layers mark every non-empty tile; object layers mark the tiles under
+their rectangles.  The tiles of each layer are also merged into as few
+rectangles as possible for drawing.  The baked form is cached next to the map as
+<map>.npz and reused while the map is unchanged, so large maps load without
+parsing the TMX again.  pytiled_parser is only imported when a map has to
+be parsed.
+"""
+import os
+
+import numpy as np
+
+# Bits of the occupancy bitmap
+OBSTACLE = 1
+WATER = 2
+FERTILE = 4
+BLOCKED = OBSTACLE | WATER
+LAYER_BITS = {"obstacles": OBSTACLE, "water": WATER, "fertile": FERTILE}
+
+# Carrying capacity multiplier of fertile ground
+FERTILE_BOOST = 3.0
+
+# Bump to invalidate cached bakes when the baking changes
+BAKE_VERSION = 1
+
+# Baked terrain by map path, shared by the worlds of a process
+_loaded = {}
+
+
+def _rasterize(layer, bitmap, tile_width, tile_height, bit):
+    """
+    Set bit in the bitmap tiles covered by a pytiled_parser layer.  Rows of
+    the bitmap count up from the bottom of the map, as world y does.
+    """
+    import pytiled_parser
+
+    rows = bitmap.shape[0]
+    if isinstance(layer, pytiled_parser.objects.LayerGroup):
+        for child in layer.layers or []:
+            _rasterize(child, bitmap, tile_width, tile_height, bit)
+    elif isinstance(layer, pytiled_parser.objects.TileLayer):
+        if not isinstance(layer.layer_data[0], list):
+            raise ValueError("infinite maps are not supported")
+        # Tiled lists rows top down
+        gids = np.array(layer.layer_data, dtype=np.int64)[::-1]
+        bitmap[:gids.shape[0], :gids.shape[1]][gids != 0] |= bit
+    elif isinstance(layer, pytiled_parser.objects.ObjectLayer):
+        for obj in layer.tiled_objects:
+            if obj.size is None:
+                continue
+            left = int(np.floor(obj.location.x / tile_width))
+            right = int(np.ceil((obj.location.x + obj.size.width) / tile_width))
+            top = rows - int(np.floor(obj.location.y / tile_height))
+            bottom = rows - int(np.ceil((obj.location.y + obj.size.height) / tile_height))
+            bitmap[max(bottom, 0):max(top, 0), max(left, 0):max(right, 0)] |= bit
+
+
+def merge_rectangles(mask):
+    """
+    Cover the True cells of a 2-D mask with few rectangles, as (col, row,
+    cols, rows) rows of an array: runs along each row, merged with the
+    identical runs of the rows above.
+    """
+    rects = []
+    # Open rectangles by (start, end) of their run
+    open_runs = {}
+    for row in range(mask.shape[0] + 1):
+        runs = set()
+        if row < mask.shape[0]:
+            edges = np.flatnonzero(np.diff(np.r_[0, mask[row].astype(np.int8), 0]))
+            runs = set(zip(edges[::2].tolist(), edges[1::2].tolist()))
+        for run in list(open_runs):
+            if run not in runs:
+                first = open_runs.pop(run)
+                rects.append((run[0], first, run[1] - run[0], row - first))
+        for run in runs:
+            open_runs.setdefault(run, row)
+    return np.array(sorted(rects, key=lambda r: (r[1], r[0])), dtype=np.int64).reshape(-1, 4)
+
+
+class Terrain():
+    def __init__(self, bitmap, tile_size, origin=(0, 0), rectangles=None):
+        """
+        bitmap holds the layer bits of every tile, row 0 at the bottom, and
+        tile_size is the (width, height) of a tile in world units.
+        rectangles, the merged tiles of each layer by layer name, are
+        computed unless given.
+        """
+        self.bitmap = np.asarray(bitmap, dtype=np.uint8)
+        self.tile_size = np.asarray(tile_size, dtype=float)
+        self.origin = np.asarray(origin, dtype=float)
+        self.rows, self.cols = self.bitmap.shape
+        if rectangles is None:
+            rectangles = {name: merge_rectangles((self.bitmap & bit) != 0) for name, bit in LAYER_BITS.items()}
+        self.rectangles = rectangles
+        # Version and modification stamp of the map this was baked from
+        self.stamp = None
+
+    @property
+    def size(self):
+        """
+        Width and height of the map in world units.
+        """
+        return self.tile_size * (self.cols, self.rows)
+
+    @classmethod
+    def from_tmx(cls, path):
+        import pytiled_parser
+
+        tile_map = pytiled_parser.parse_tile_map(path)
+        tile_width, tile_height = tile_map.tile_size
+        bitmap = np.zeros((tile_map.map_size.height, tile_map.map_size.width), dtype=np.uint8)
+        for layer in tile_map.layers:
+            bit = LAYER_BITS.get(layer.name.lower())
+            if bit is not None:
+                _rasterize(layer, bitmap, tile_width, tile_height, bit)
+        return cls(bitmap, (tile_width, tile_height))
+
+    def tiles(self, positions):
+        """
+        (col, row) of the tiles holding positions, and a mask of the ones
+        on the map.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        ij = np.floor((positions - self.origin) / self.tile_size).astype(np.int64)
+        inside = (ij[:, 0] >= 0) & (ij[:, 0] < self.cols) & (ij[:, 1] >= 0) & (ij[:, 1] < self.rows)
+        return ij, inside
+
+    def bits(self, positions):
+        """
+        Layer bits of the tiles under positions; 0 off the map.
+        """
+        ij, inside = self.tiles(positions)
+        bits = np.zeros(len(ij), dtype=np.uint8)
+        bits[inside] = self.bitmap[ij[inside, 1], ij[inside, 0]]
+        return bits
+
+    def blocked(self, positions, radius):
+        """
+        Mask of the positions whose box of half-size radius touches an
+        obstacle or water tile.  The box is sampled at tile spacing, so no
+        tile can slip between the samples.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        steps = int(np.ceil(2 * radius / self.tile_size.min())) + 1
+        offsets = np.linspace(-radius, radius, steps)
+        result = np.zeros(len(positions), dtype=bool)
+        for dx in offsets:
+            for dy in offsets:
+                result |= (self.bits(positions + (dx, dy)) & BLOCKED) != 0
+        return result
+
+    def fertility(self, positions):
+        """
+        Carrying capacity multiplier at positions: none in water, raised on
+        fertile ground.
+        """
+        bits = self.bits(positions)
+        return np.where(bits & WATER, 0.0, np.where(bits & FERTILE, FERTILE_BOOST, 1.0))
+
+    def world_rectangles(self, name):
+        """
+        (left, bottom, width, height) in world units of the merged tiles of
+        a layer.
+        """
+        rects = self.rectangles[name].astype(float)
+        return np.hstack([self.origin + rects[:, :2] * self.tile_size, rects[:, 2:] * self.tile_size])
+
+    def save(self, path, stamp):
+        rectangles = {f"rectangles_{name}": rects for name, rects in self.rectangles.items()}
+        np.savez_compressed(path, bitmap=self.bitmap, tile_size=self.tile_size, origin=self.origin,
+                            stamp=np.array(stamp, dtype=np.int64), **rectangles)
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [BAKE_VERSION, stat.st_mtime_ns, stat.st_size]
+
+
+def load(path):
+    """
+    The terrain of the Tiled map at path, from memory, the baked cache next
+    to it or, failing both, parsed from the map and baked.
+    """
+    path = os.path.abspath(path)
+    stamp = _stamp(path)
+    terrain = _loaded.get(path)
+    if terrain is not None and terrain.stamp == stamp:
+        return terrain
+
+    cache = f"{path}.npz"
+    terrain = None
+    if os.path.exists(cache):
+        with np.load(cache) as baked:
+            if baked["stamp"].tolist() == stamp:
+                rectangles = {name: baked[f"rectangles_{name}"] for name in LAYER_BITS}
+                terrain = Terrain(baked["bitmap"], baked["tile_size"], baked["origin"], rectangles)
+    if terrain is None:
+        terrain = Terrain.from_tmx(path)
+        try:
+            terrain.save(cache, stamp)
+        except OSError:
+            # A read-only map directory just means no cache
+            pass
+
+    terrain.stamp = stamp
+    _loaded[path] = terrain
+    return terrain
@@ -0,0 +1,78 @@
+"""
+Checkpoints resume a world bit for bit: a restored world steps on exactly
+as the world it was saved from.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from checkpoint import CheckpointWriter, restore, save_world
+from population import AgentStore
+from world import World
+
+MAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "maps", "meadow.tmx")
+
+CONFIGS = {
+    "plain": {},
+    "regrowth_lifecycle": {"regrowth": True, "lifecycle": True},
+    "pathfinding": {"pathfinding": True},
+    "flow_field": {"flow_field": True},
+    "predators": {"predator_count": 4, "lifecycle": True},
+    "strategies": {"strategies": "RANDOM,NEAREST,DENSITY,GREEDY"},
+    "terrain": {"terrain": MAP, "regrowth": True},
+    "terrain_flow_field": {"terrain": MAP, "flow_field": True},
+}
+
+
+def make_world(**overrides):
+    if "terrain" in overrides:
+        pytest.importorskip("pytiled_parser")
+    world = World(player_count=20, coin_count=200, seed=3, **overrides)
+    world.setup()
+    return world
+
+
+def assert_same(world, other):
+    assert world.tick == other.tick
+    assert world.time == other.time
+    assert world.score == other.score
+    assert world.kills == other.kills
+    np.testing.assert_array_equal(world.food_by_strategy, other.food_by_strategy)
+    assert world.food_by_strategy.sum() == world.score
+    assert world.rng.bit_generator.state == other.rng.bit_generator.state
+    for name in AgentStore.FIELDS:
+        np.testing.assert_array_equal(getattr(world.agents, name), getattr(other.agents, name), err_msg=name)
+    assert world.agents.free == other.agents.free
+    np.testing.assert_array_equal(world.food.alive, other.food.alive)
+    np.testing.assert_array_equal(world.food_positions, other.food_positions)
+    if world.flow_field is not None:
+        np.testing.assert_array_equal(world.flow_field.dist, other.flow_field.dist)
+
+
+@pytest.mark.parametrize("overrides", CONFIGS.values(), ids=list(CONFIGS))
+def test_restore_steps_on_identically(tmp_path, overrides):
+    world = make_world(**overrides)
+    for _ in range(150):
+        world.step()
+    path = str(tmp_path / "run.ckpt")
+    save_world(path, world)
+    resumed = restore(path)
+    assert_same(world, resumed)
+
+    for _ in range(150):
+        world.step()
+        resumed.step()
+    assert_same(world, resumed)
+
+
+def test_writer_saves_on_interval(tmp_path):
+    world = make_world()
+    path = str(tmp_path / "run.ckpt")
+    with CheckpointWriter(path, interval=50) as writer:
+        while world.tick < 120:
+            world.step()
+            writer.update(world)
+    assert writer.saved == 2
+    resumed = restore(path)
+    assert resumed.tick == 100
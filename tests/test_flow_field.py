@@ -0,0 +1,46 @@
+"""
+A flow field kept up to date by adding and removing food matches one built
+from scratch over the same food, blocked cells included.
+"""
+import numpy as np
+import pytest
+
+from agent import FlowField, GridMap
+
+SIZE = 24
+STEPS = 200
+
+
+def make_grid(rng):
+    blocked = rng.random(SIZE * SIZE) < 0.25
+    return GridMap((0, 0), (SIZE, SIZE), 1.0, lambda centers, half_size: blocked)
+
+
+def rebuild(grid, food):
+    field = FlowField(grid)
+    if food:
+        field.add_food(np.array(food))
+    return field
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_match_rebuild(seed):
+    rng = np.random.default_rng(seed)
+    grid = make_grid(rng)
+    field = FlowField(grid)
+    food = []
+
+    for _ in range(STEPS):
+        if food and rng.random() < 0.5:
+            picked = set(rng.choice(len(food), size=rng.integers(1, min(len(food), 4) + 1), replace=False).tolist())
+            field.remove_food(np.array([food[i] for i in picked]))
+            food = [p for i, p in enumerate(food) if i not in picked]
+        else:
+            # Food may land in blocked cells, which still act as sources
+            added = rng.uniform(0, SIZE, size=(rng.integers(1, 4), 2)).tolist()
+            field.add_food(np.array(added))
+            food.extend(added)
+
+        expected = rebuild(grid, food)
+        np.testing.assert_array_equal(field.count, expected.count)
+        np.testing.assert_array_equal(field.dist, expected.dist)
@@ -0,0 +1,79 @@
+"""
+A recorded run replays the state of the world it was recorded from, both
+played forward and after seeking.
+"""
+import numpy as np
+import pytest
+
+from recorder import AGENT_COLUMNS, ReplayWorld, TrajectoryReader, TrajectoryRecorder
+from world import World
+
+TICKS = 400
+CHUNK_TICKS = 64
+
+CONFIGS = {
+    "plain": {},
+    "regrowth_lifecycle": {"regrowth": True, "lifecycle": True},
+    "predators": {"predator_count": 4, "lifecycle": True},
+}
+
+
+def make_world(**overrides):
+    world = World(player_count=20, coin_count=200, seed=5, **overrides)
+    world.setup()
+    return world
+
+
+def snapshot(world):
+    """
+    The recorded columns of a world, as the recorder stores them, and its
+    live food by id.
+    """
+    agents = {name: getattr(world.agents, name).astype(dtype) for name, dtype in AGENT_COLUMNS.items()}
+    food = dict(zip(world.food_ids.tolist(), map(tuple, world.food_positions.tolist())))
+    return world.tick, world.score, agents, food
+
+
+def assert_matches(replay, expected):
+    tick, score, agents, food = expected
+    assert replay.tick == tick
+    assert replay.score == score
+    for name, column in agents.items():
+        np.testing.assert_array_equal(getattr(replay.agents, name), column, err_msg=f"{name} at {tick}")
+    assert dict(zip(replay.food_ids.tolist(), map(tuple, replay.food_positions.tolist()))) == food
+
+
+@pytest.fixture(params=list(CONFIGS.values()), ids=list(CONFIGS))
+def recording(request, tmp_path):
+    """
+    A recorded run and the snapshot of every tick of it.
+    """
+    world = make_world(**request.param)
+    snapshots = []
+    with TrajectoryRecorder(str(tmp_path), CHUNK_TICKS) as recorder:
+        recorder.record(world)
+        snapshots.append(snapshot(world))
+        while not world.done and world.tick < TICKS:
+            world.step()
+            recorder.record(world)
+            snapshots.append(snapshot(world))
+    return str(tmp_path), snapshots
+
+
+def test_replay_matches_every_tick(recording):
+    directory, snapshots = recording
+    replay = ReplayWorld(TrajectoryReader(directory))
+    assert_matches(replay, snapshots[0])
+    for expected in snapshots[1:]:
+        replay.step()
+        assert_matches(replay, expected)
+    assert replay.done
+
+
+def test_seek_matches(recording):
+    directory, snapshots = recording
+    replay = ReplayWorld(TrajectoryReader(directory))
+    rng = np.random.default_rng(0)
+    for tick in rng.integers(len(snapshots), size=30).tolist() + [len(snapshots) - 1, 0]:
+        replay.seek(tick)
+        assert_matches(replay, snapshots[tick])
@@ -0,0 +1,149 @@
+"""
+Process-wide texture registry
+
+Every character skin, monster portrait and food animation is loaded once and the same texture
+objects are shared by all the sprites that show them, so startup time and
+texture memory no longer grow with the population.
+
+The images under Sprites/ can optionally be packed into a single atlas
+image with build_atlas; after load_atlas, textures for those files are cut
+out of the atlas instead of being read one file at a time.
+"""
+import json
+import os
+
+import arcade
+
+SPRITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Sprites")
+ATLAS_IMAGE = os.path.join(SPRITES_DIR, "atlas.png")
+ATLAS_INDEX = os.path.join(SPRITES_DIR, "atlas.json")
+
+# Directions of the isometric food sprites, in animation order
+FOOD_DIRECTIONS = ["NE", "NW", "SW", "SE"]
+
+_textures = {}
+_atlas = {}
+
+
+def _atlas_key(filename):
+    """
+    Path of a file relative to Sprites/, as used in the atlas index.
+    """
+    if filename.startswith(":"):
+        return filename
+    return os.path.relpath(os.path.abspath(filename), SPRITES_DIR).replace(os.sep, "/")
+
+
+def _load(filename, mirrored=False):
+    key = (_atlas_key(filename), mirrored)
+    texture = _textures.get(key)
+    if texture is None:
+        region = _atlas.get(key[0])
+        if region is not None:
+            x, y, width, height = region
+            texture = arcade.load_texture(ATLAS_IMAGE, x, y, width, height, mirrored=mirrored)
+        else:
+            texture = arcade.load_texture(filename, mirrored=mirrored)
+        _textures[key] = texture
+    return texture
+
+
+def load_texture_pair(filename):
+    """
+    Load a texture pair, with the second being a mirror image.
+    """
+    return [_load(filename), _load(filename, mirrored=True)]
+
+
+def character_textures(main_path):
+    """
+    Idle texture pair and the eight walk texture pairs of a character skin.
+    """
+    key = ("character", main_path)
+    textures = _textures.get(key)
+    if textures is None:
+        idle = load_texture_pair(f"{main_path}_idle.png")
+        walk = [load_texture_pair(f"{main_path}_walk{i}.png") for i in range(8)]
+        textures = _textures[key] = (idle, walk)
+    return textures
+
+
+def portrait_textures(name):
+    """
+    A monster portrait as a character: the same texture pair idle and at
+    every step of the walk.
+    """
+    key = ("portrait", name)
+    textures = _textures.get(key)
+    if textures is None:
+        pair = load_texture_pair(os.path.join(SPRITES_DIR, "Monsters", f"monster_portrait_square_{name}.png"))
+        textures = _textures[key] = (pair, [pair])
+    return textures
+
+
+def food_textures(name="apple"):
+    """
+    The isometric textures of a food item, one per facing direction.
+    """
+    key = ("food", name)
+    textures = _textures.get(key)
+    if textures is None:
+        textures = _textures[key] = [
+            _load(os.path.join(SPRITES_DIR, "Isometric", f"{name}_{d}.png")) for d in FOOD_DIRECTIONS]
+    return textures
+
+
+def clear():
+    _textures.clear()
+
+
+def build_atlas(folders=("Isometric",), image_file=ATLAS_IMAGE, index_file=ATLAS_INDEX, max_width=2048):
+    """
+    Pack the PNG files of the given Sprites/ folders into one image.
+
+    Images are placed left to right on shelves as tall as their tallest
+    image, tallest first.  The region of each file is written to index_file
+    as JSON keyed by file path relative to Sprites/.
+    """
+    from PIL import Image
+
+    images = []
+    for folder in folders:
+        directory = os.path.join(SPRITES_DIR, folder)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".png"):
+                path = os.path.join(directory, name)
+                images.append((_atlas_key(path), Image.open(path).convert("RGBA")))
+    images.sort(key=lambda item: item[1].height, reverse=True)
+
+    regions = {}
+    x = y = shelf_height = 0
+    for path, image in images:
+        if x + image.width > max_width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        regions[path] = (x, y, image.width, image.height)
+        x += image.width
+        shelf_height = max(shelf_height, image.height)
+
+    atlas = Image.new("RGBA", (max_width, y + shelf_height))
+    for path, image in images:
+        atlas.paste(image, regions[path][:2])
+    atlas.save(image_file)
+
+    with open(index_file, "w") as f:
+        json.dump(regions, f)
+    return regions
+
+
+def load_atlas(index_file=ATLAS_INDEX):
+    """
+    Cut textures for the packed files out of the atlas from now on,
+    building the atlas first if it does not exist yet.
+    """
+    if not os.path.exists(index_file):
+        build_atlas(index_file=index_file)
+    with open(index_file) as f:
+        _atlas.update({path: tuple(region) for path, region in json.load(f).items()})
+    clear()
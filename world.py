@@ -0,0 +1,711 @@
+"""
+Headless simulation engine
+
+Holds all of the simulation state (agents, food, walls, score and time) and
+advances it with World.step(dt).  Nothing in here imports arcade, so a world
+can be stepped on a machine without a display; GameView in game.py only
+renders it.
+"""
+import numpy as np
+
+from spatial import FoodGrid, CellList
+from food import FoodPool, FoodField
+from collision import resolve_food_contacts
+from placement import GridPlacer, cell_size_for
+from physics import Physics
+from terrain import load as load_terrain
+from agent import GridMap, PathFinder, FlowField
+from population import (AgentStore, steer, unit_vectors, SKIN_COUNT, WANDER_PERIOD, STRATEGIES, HERBIVORE,
+                        PREDATOR, NO_TARGET)
+from strategies import CHOOSERS, codes, first_per_row
+from profiler import NULL_PROFILER
+from config import (SimConfig, WORLD_WIDTH, WORLD_HEIGHT, WALL_MARGIN,  # noqa: F401
+                    PLAYER_COUNT, COIN_COUNT)
+
+WALL_SIZE = 64
+
+# Agents spawn around the middle of the initial screen
+SPAWN_CENTER = (960, 540)
+SPAWN_SPREAD = 100.0
+# Draws of fresh spawn positions for agents that landed in terrain, before
+# the rest are put on the free cells nearest to where they were drawn
+SPAWN_DRAWS = 20
+
+# Collision radii, matched to the sprite sizes used by the renderer
+AGENT_RADIUS = 22
+FOOD_RADIUS = 14
+
+# Cell size of the food contact grid: an agent's contacts lie within the
+# cells next to its own
+CONTACT_CELL = 2 * (AGENT_RADIUS + FOOD_RADIUS)
+
+# Cell size of the pathfinding grid
+PATH_CELL_SIZE = 64
+
+# Size of the patches food regrows on
+REGROWTH_PATCH = 512
+
+# Length of one simulation tick, and how many ticks a renderer may run to
+# catch up after a slow frame before it drops the backlog
+SIM_DT = 1 / 60
+MAX_CATCH_UP = 5
+
+
+class World():
+    def __init__(self, config=None, **overrides):
+        """
+        A world set up from config, with any SimConfig field overridden by
+        keyword, e.g. World(player_count=100).
+        """
+        self.config = (config or SimConfig()).replace(**overrides)
+        if self.config.terrain:
+            # A tilemap sets the size of the world
+            width, height = load_terrain(self.config.terrain).size
+            self.config = self.config.replace(world_width=int(width), world_height=int(height))
+
+        # All randomness in a run comes from this generator, so a seeded
+        # world replays bit for bit
+        self.rng = None
+
+        # Swap in a profiler.Profiler to time the phases of each tick
+        self.profiler = NULL_PROFILER
+
+        self.agents = None
+        self.walls = None
+        # Obstacles, water and fertile ground of a tilemap world
+        self.terrain = None
+        self.physics = None
+        self.pathfinder = None
+        self.flow_field = None
+        # Remaining waypoints of the agents routing to their target
+        self.paths = {}
+        self.food = None
+        self.food_grid = None
+        # Fine grid of the live food for contacts, rebuilt when food changed
+        self.contact_grid = None
+        self.contacts_stale = True
+        self.placer = None
+        # Regrowth of eaten food, when the config asks for it
+        self.food_field = None
+        # Herbivores and predators by neighbourhood, rebuilt each tick when
+        # there are predators
+        self.prey_grid = None
+        self.predator_grid = None
+        # Herbivores running from a predator this tick, and where to
+        self.fleeing = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)))
+
+        # Ids of the food eaten and grown, and slots of the agents born,
+        # died and caught by predators, during the last step
+        self.eaten = []
+        self.grown = []
+        self.born = []
+        self.died = []
+        self.caught = []
+
+        self.score = 0
+        # Food eaten by the agents of each strategy, dead ones included, so
+        # the counts add up to the score
+        self.food_by_strategy = np.zeros(len(STRATEGIES), dtype=np.int64)
+        # Herbivores caught by predators
+        self.kills = 0
+        self.time = 0.0
+        self.tick = 0
+
+    @property
+    def done(self):
+        """
+        Whether every herbivore has died, or all the food is gone for good,
+        which never happens with regrowth.
+        """
+        agents = self.agents
+        return (not np.any(agents.alive & (agents.species == HERBIVORE)) or
+                (self.food_field is None and len(self.food) == 0))
+
+    @property
+    def food_ids(self):
+        """
+        Ids of the live food, in the same order as food_positions.
+        """
+        return self.food.ids
+
+    @property
+    def food_positions(self):
+        return self.food.live_positions()
+
+    def setup(self):
+        config = self.config
+        self.rng = np.random.default_rng(config.seed)
+        self.score = 0
+        self.food_by_strategy = np.zeros(len(STRATEGIES), dtype=np.int64)
+        self.kills = 0
+        self.time = 0.0
+        self.tick = 0
+        self.build()
+
+        count = config.player_count
+        total = count + config.predator_count
+        self.agents = AgentStore(total, config.max_agents if config.lifecycle else total)
+        self.scatter(np.arange(count), lambda n: self.rng.normal(SPAWN_CENTER, SPAWN_SPREAD, (n, 2)))
+        self.agents.skins[:count] = self.rng.integers(SKIN_COUNT, size=count)
+        self.agents.vision_radius[:] = config.vision_radius
+        self.agents.acceleration[:] = config.acceleration
+        self.agents.energy[:total] = config.start_energy
+        # Strategies are dealt out to the agents in turn
+        strategies = codes(config.strategies)
+        self.agents.strategies[:count] = strategies[np.arange(count) % len(strategies)]
+
+        if config.predator_count:
+            # Predators start anywhere, rather than among their prey
+            predators = np.arange(count, total)
+            low = self.physics.lower + AGENT_RADIUS
+            high = self.physics.upper - AGENT_RADIUS
+            self.scatter(predators, lambda n: self.rng.uniform(low, high, (n, 2)))
+            self.agents.skins[predators] = self.rng.integers(SKIN_COUNT, size=len(predators))
+            self.agents.species[predators] = PREDATOR
+
+        self.place_food(config.coin_count)
+
+    def scatter(self, agents, draw):
+        """
+        Put agents at the positions draw(n) returns for n of them, drawing
+        again up to SPAWN_DRAWS times for the ones that land in terrain.
+        """
+        positions = draw(len(agents))
+        if self.terrain is not None:
+            stuck = np.flatnonzero(self.physics.blocked(positions, AGENT_RADIUS))
+            for _ in range(SPAWN_DRAWS):
+                if len(stuck) == 0:
+                    break
+                positions[stuck] = draw(len(stuck))
+                stuck = stuck[self.physics.blocked(positions[stuck], AGENT_RADIUS)]
+            if len(stuck) > 0:
+                positions[stuck] = self.free_spots(positions[stuck])
+        self.agents.positions[agents] = positions
+
+    def free_spots(self, positions):
+        """
+        Centres of distinct walkable cells of the pathfinding grid, the
+        nearest first to the middle of positions, one per position; cells
+        are reused only when there are fewer of them than positions.
+        """
+        grid = GridMap(self.physics.lower, self.physics.upper, PATH_CELL_SIZE, blocked=self.physics.blocked)
+        free = np.flatnonzero(~grid.blocked)
+        if len(free) == 0:
+            raise ValueError("the terrain leaves no room to spawn agents")
+        centers = grid.centers(free)
+        order = np.argsort(np.sum((centers - positions.mean(axis=0)) ** 2, axis=1), kind="stable")
+        return centers[order[np.arange(len(positions)) % len(free)]]
+
+    def to_state(self):
+        """
+        Everything needed to resume the world bit for bit: a dict of plain
+        metadata and a dict of array copies, safe to hand to another thread.
+        """
+        agents = self.agents
+        food = self.food
+        meta = {"config": self.config.to_dict(),
+                "rng": self.rng.bit_generator.state,
+                "tick": self.tick,
+                "time": self.time,
+                "score": self.score,
+                "kills": self.kills,
+                "food_count": food.count}
+        arrays = {f"agents.{name}": getattr(agents, name).copy() for name in AgentStore.FIELDS}
+        arrays["agents.free"] = np.array(agents.free, dtype=np.int64)
+        arrays["food_by_strategy"] = self.food_by_strategy.copy()
+        for name in ("positions", "alive", "dense", "slot"):
+            arrays[f"food.{name}"] = getattr(food, name).copy()
+        arrays["food_grid.ids"] = self.food_grid.ids()
+
+        # Waypoints of routing agents, concatenated
+        routing = sorted(self.paths)
+        arrays["paths.agents"] = np.array(routing, dtype=np.int64)
+        arrays["paths.lengths"] = np.array([len(self.paths[i]) for i in routing], dtype=np.int64)
+        arrays["paths.points"] = (np.concatenate([self.paths[i] for i in routing]) if routing
+                                  else np.zeros((0, 2)))
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        """
+        A world resumed from the output of to_state.  The arrays are copied,
+        so they may be read-only memory maps.
+        """
+        world = cls(SimConfig(**meta["config"]))
+        world.rng = np.random.default_rng()
+        world.rng.bit_generator.state = meta["rng"]
+        world.tick = meta["tick"]
+        world.time = meta["time"]
+        world.score = meta["score"]
+        world.kills = meta["kills"]
+        world.food_by_strategy = np.array(arrays["food_by_strategy"])
+        world.build()
+
+        agents = world.agents = AgentStore(0, len(arrays["agents.positions"]))
+        for name in AgentStore.FIELDS:
+            getattr(agents, name)[:] = arrays[f"agents.{name}"]
+        agents.free = arrays["agents.free"].tolist()
+
+        world.clear_food(world.config.coin_count)
+        food = world.food
+        for name in ("positions", "alive", "dense", "slot"):
+            setattr(food, name, np.array(arrays[f"food.{name}"]))
+        food.count = meta["food_count"]
+        ids = np.array(arrays["food_grid.ids"])
+        positions = food.positions[ids]
+        world.placer.occupy(positions)
+        world.index_food(ids, positions)
+
+        points = np.array(arrays["paths.points"])
+        ends = np.cumsum(arrays["paths.lengths"])
+        for i, start, end in zip(arrays["paths.agents"].tolist(), (ends - arrays["paths.lengths"]).tolist(),
+                                 ends.tolist()):
+            world.paths[i] = points[start:end]
+        return world
+
+    def build(self):
+        """
+        Set up the parts of the world that follow from the config alone:
+        walls, terrain, physics and the pathfinding and neighbour grids.
+        """
+        config = self.config
+        self.eaten = []
+        self.grown = []
+        self.born = []
+        self.died = []
+        self.caught = []
+        self.fleeing = (np.zeros(0, dtype=np.int64), np.zeros((0, 2)))
+
+        self.walls = self.build_walls()
+        self.terrain = load_terrain(config.terrain) if config.terrain else None
+        self.physics = Physics((WALL_SIZE - config.wall_margin, WALL_SIZE - config.wall_margin),
+                               (config.world_width + config.wall_margin,
+                                config.world_height + config.wall_margin),
+                               AGENT_RADIUS, config.friction, self.terrain)
+        self.paths = {}
+        self.pathfinder = self.flow_field = None
+        if config.pathfinding or config.flow_field:
+            grid = GridMap(self.physics.lower, self.physics.upper, PATH_CELL_SIZE,
+                           blocked=self.physics.blocked)
+            if config.pathfinding:
+                self.pathfinder = PathFinder(grid)
+            if config.flow_field:
+                self.flow_field = FlowField(grid)
+        self.prey_grid = self.predator_grid = None
+        if config.predator_count:
+            self.prey_grid = CellList(self.physics.lower, self.physics.upper, config.vision_radius)
+            self.predator_grid = CellList(self.physics.lower, self.physics.upper, config.vision_radius)
+
+    def build_walls(self):
+        """
+        Rectangles (left, bottom, right, top) of the bricks around the world.
+
+        These are only drawn; the physics stage treats the inner edges of the
+        walls as analytic boundaries.
+        """
+        width = self.config.world_width
+        height = self.config.world_height
+        margin = self.config.wall_margin
+
+        walls = []
+        for x in range(-margin, width + margin + 1, WALL_SIZE):
+            walls.append((x, -margin))
+            walls.append((x, height + margin))
+
+        for y in range(-margin, height + margin + 1, WALL_SIZE):
+            walls.append((-margin, y))
+            walls.append((width + margin, y))
+
+        walls = np.array(walls, dtype=float)
+        return np.hstack([walls, walls + WALL_SIZE])
+
+    def place_food(self, count):
+        """
+        Scatter count food items over the world, no two closer than their
+        diameter, on a jittered grid that is kept around for respawning.
+        """
+        self.clear_food(count)
+        self.add_food(self.placer.place(count, self.rng))
+
+    def clear_food(self, count):
+        """
+        Empty food stores, with a placer sized for count items.
+        """
+        config = self.config
+        width = config.world_width
+        height = config.world_height
+        spacing = 2 * FOOD_RADIUS
+        self.placer = GridPlacer(width, height, spacing, cell_size_for(width, height, count, spacing),
+                                 blocked=self.physics.blocked)
+        self.food = FoodPool(count)
+        self.food_grid = FoodGrid(config.vision_radius)
+        self.contact_grid = CellList(self.physics.lower, self.physics.upper, CONTACT_CELL)
+        self.contacts_stale = True
+        self.food_field = None
+        if config.regrowth:
+            fertility = self.terrain.fertility if self.terrain is not None else None
+            self.food_field = FoodField(self.placer, REGROWTH_PATCH, config.carrying_capacity,
+                                        config.regrowth_rate, config.season_period, config.season_amplitude,
+                                        fertility)
+
+    def add_food(self, positions):
+        """
+        Add food at positions, whose placer cells are already taken, to
+        every food index; returns the new ids.
+        """
+        ids = self.food.add(positions)
+        self.index_food(ids, positions)
+        return ids
+
+    def index_food(self, ids, positions):
+        self.food_grid.insert(ids, positions)
+        self.contacts_stale = True
+        if self.flow_field is not None:
+            self.flow_field.add_food(positions)
+        if self.food_field is not None:
+            self.food_field.add(positions)
+
+    def regrow(self):
+        """
+        Grow food back on the regrowth field.
+        """
+        positions = self.food_field.grow(self.tick, self.rng)
+        if len(positions) > 0:
+            self.grown = self.add_food(positions).tolist()
+
+    def choose_targets(self, agents):
+        """
+        Pick a visible food for each of the given agents, running each
+        strategy once on the pairs of the agents that follow it.
+        """
+        if len(agents) == 0:
+            return
+        with self.profiler.phase("visibility"):
+            rows, ids, positions = self.food_grid.query_radius_batch(
+                self.agents.positions[agents], self.agents.vision_radius[agents])
+        if len(rows) == 0:
+            return
+
+        pair_strategies = self.agents.strategies[agents][rows]
+        used = np.unique(pair_strategies)
+        chosen = []
+        for code in used.tolist():
+            with self.profiler.phase(f"strategy {STRATEGIES[code].lower()}"):
+                if len(used) == 1:
+                    chosen.append(CHOOSERS[code](self, agents, rows, ids, positions))
+                else:
+                    pairs = np.flatnonzero(pair_strategies == code)
+                    chosen.append(pairs[CHOOSERS[code](self, agents, rows[pairs], ids[pairs], positions[pairs])])
+        chosen = np.concatenate(chosen)
+        self.agents.set_targets(agents[rows[chosen]], ids[chosen], positions[chosen])
+
+        if self.pathfinder is not None:
+            self.route(agents[rows[chosen]])
+
+    def route(self, agents):
+        """
+        Plan paths to the targets of the given agents, dropping targets
+        that cannot be reached.
+        """
+        for i in agents.tolist():
+            path = self.pathfinder.find_path(self.agents.positions[i], self.agents.target_positions[i])
+            if path is None:
+                self.agents.clear_targets(i)
+                self.paths.pop(i, None)
+            else:
+                self.paths[i] = path
+
+    def steer_points(self):
+        """
+        Where each agent steers: its target, or the next waypoint on the
+        path to it when routing around obstacles.
+        """
+        points = self.agents.target_positions
+        if not self.paths:
+            return points
+
+        points = points.copy()
+        reach = self.pathfinder.grid.cell_size / 2
+        for i in list(self.paths):
+            if not self.agents.has_target[i]:
+                del self.paths[i]
+                continue
+            path = self.paths[i]
+            # Move on to the next waypoint once the current one is reached
+            while len(path) > 1 and np.linalg.norm(path[0] - self.agents.positions[i]) < reach:
+                path = path[1:]
+            self.paths[i] = path
+            points[i] = path[0]
+        return points
+
+    def steer(self):
+        """
+        Steer every agent with a target towards it, and every predator
+        with prey after it at predator speed.  Herbivores without a target
+        follow the flow field when there is one; other idle agents wander
+        in a fresh random direction every WANDER_PERIOD ticks.  Fleeing
+        herbivores run from their predator whatever else they were doing.
+        """
+        config = self.config
+        agents = self.agents
+        seeking = np.flatnonzero(agents.has_target)
+        if len(seeking) > 0:
+            points = self.steer_points()
+            directions = unit_vectors(points[seeking] - agents.positions[seeking])
+            agents.velocities[seeking] = steer(agents.velocities[seeking], directions,
+                                               agents.acceleration[seeking], config.movement_speed)
+
+        hunting = agents.prey != NO_TARGET
+        hunters = np.flatnonzero(hunting)
+        if len(hunters) > 0:
+            directions = unit_vectors(agents.positions[agents.prey[hunters]] - agents.positions[hunters])
+            agents.velocities[hunters] = steer(agents.velocities[hunters], directions,
+                                               agents.acceleration[hunters], config.predator_speed)
+
+        idle = agents.alive & ~agents.has_target & ~hunting
+        if self.flow_field is not None:
+            # Herbivores that see no food follow the flow field towards the nearest
+            searching = np.flatnonzero(idle & (agents.species == HERBIVORE))
+            if len(searching) > 0:
+                directions = self.flow_field.directions(agents.positions[searching])
+                agents.velocities[searching] = steer(agents.velocities[searching], directions,
+                                                     agents.acceleration[searching], config.movement_speed)
+            idle &= agents.species != HERBIVORE
+
+        wandering = np.flatnonzero(idle & (agents.counters == 0))
+        if len(wandering) > 0:
+            theta = self.rng.uniform(high=2 * np.pi, size=len(wandering))
+            agents.velocities[wandering] = config.movement_speed * np.column_stack([np.cos(theta), np.sin(theta)])
+
+        fleeing, directions = self.fleeing
+        if len(fleeing) > 0:
+            agents.velocities[fleeing] = steer(agents.velocities[fleeing], directions,
+                                               agents.acceleration[fleeing], config.movement_speed)
+
+    def hunt(self):
+        """
+        Sense the agents of the other species through the neighbour grids:
+        predators chase the nearest herbivore within their vision radius,
+        and herbivores with a predator within flee_radius run from the
+        nearest one.
+        """
+        agents = self.agents
+        living = np.flatnonzero(agents.alive)
+        predators = living[agents.species[living] == PREDATOR]
+        herbivores = living[agents.species[living] == HERBIVORE]
+        self.prey_grid.build(herbivores, agents.positions[herbivores])
+        self.predator_grid.build(predators, agents.positions[predators])
+
+        agents.prey[predators] = NO_TARGET
+        rows, slots, positions = self.prey_grid.query_radius_batch(agents.positions[predators],
+                                                                   agents.vision_radius[predators])
+        if len(rows) > 0:
+            d2 = np.sum((positions - agents.positions[predators[rows]]) ** 2, axis=1)
+            nearest = first_per_row(np.lexsort((d2, rows)), rows)
+            agents.prey[predators[rows[nearest]]] = slots[nearest]
+
+        fleeing = np.zeros(0, dtype=np.int64)
+        directions = np.zeros((0, 2))
+        rows, slots, positions = self.predator_grid.query_radius_batch(agents.positions[herbivores],
+                                                                       self.config.flee_radius)
+        if len(rows) > 0:
+            d2 = np.sum((positions - agents.positions[herbivores[rows]]) ** 2, axis=1)
+            nearest = first_per_row(np.lexsort((d2, rows)), rows)
+            fleeing = herbivores[rows[nearest]]
+            directions = unit_vectors(agents.positions[fleeing] - positions[nearest])
+        self.fleeing = (fleeing, directions)
+
+    def eat(self):
+        """
+        Remove the food touched by any herbivore and add it to the score.
+        """
+        if self.contacts_stale:
+            self.contact_grid.build(self.food.ids, self.food.live_positions())
+            self.contacts_stale = False
+        living = np.flatnonzero(self.agents.alive & (self.agents.species == HERBIVORE))
+        eaters, eaten, eaten_positions = resolve_food_contacts(self.agents.positions[living], AGENT_RADIUS,
+                                                               self.contact_grid, FOOD_RADIUS)
+        self.eaten = eaten.tolist()
+        if len(eaten) == 0:
+            return
+
+        eaters = living[eaters]
+        self.score += len(eaten)
+        np.add.at(self.agents.food_eaten, eaters, 1)
+        np.add.at(self.food_by_strategy, self.agents.strategies[eaters], 1)
+        np.add.at(self.agents.energy, eaters, self.config.food_energy)
+
+        self.food.remove(eaten)
+        self.food_grid.remove(eaten)
+        self.contacts_stale = True
+        self.placer.release(eaten_positions)
+        if self.food_field is not None:
+            self.food_field.remove(eaten_positions)
+        if self.flow_field is not None:
+            self.flow_field.remove_food(eaten_positions)
+
+        self.clear_lost_targets()
+
+    def capture(self):
+        """
+        Predators that reach their prey kill it and take prey_energy;
+        prey chased by several predators goes to the first of them.
+        """
+        agents = self.agents
+        hunters = np.flatnonzero(agents.prey != NO_TARGET)
+        prey = agents.prey[hunters]
+        reached = np.sum((agents.positions[hunters] - agents.positions[prey]) ** 2, axis=1) <= (2 * AGENT_RADIUS) ** 2
+        prey, first = np.unique(prey[reached], return_index=True)
+        self.caught = prey.tolist()
+        if len(prey) == 0:
+            return
+
+        agents.energy[hunters[reached][first]] += self.config.prey_energy
+        agents.kill(prey)
+        agents.prey[np.isin(agents.prey, prey)] = NO_TARGET
+        self.kills += len(prey)
+
+    def clear_lost_targets(self):
+        """
+        Drop the targets whose food has been eaten.
+        """
+        agents = self.agents
+        agents.clear_targets(agents.has_target & ~self.food.alive[agents.targets])
+
+    def live(self):
+        """
+        Burn energy, then let starved and old agents die and well-fed ones
+        split in two, sharing their energy with the newborn.
+        """
+        config = self.config
+        agents = self.agents
+        alive = agents.alive
+        speed2 = np.sum(agents.velocities[alive] ** 2, axis=1)
+        agents.energy[alive] -= config.basal_metabolism + config.move_metabolism * speed2
+        agents.age[alive] += 1
+
+        dead = np.flatnonzero(alive & ((agents.energy <= 0) | (agents.age >= config.max_age)))
+        agents.kill(dead)
+        self.died.extend(dead.tolist())
+
+        parents = np.flatnonzero(agents.alive & (agents.energy >= config.birth_energy))
+        children = agents.spawn(len(parents))
+        parents = parents[:len(children)]
+        self.born = children.tolist()
+        if len(children) == 0:
+            return
+
+        agents.energy[parents] /= 2
+        agents.energy[children] = agents.energy[parents]
+        offsets = self.rng.normal(0, AGENT_RADIUS, (len(children), 2))
+        agents.positions[children] = np.clip(agents.positions[parents] + offsets,
+                                             self.physics.lower + AGENT_RADIUS,
+                                             self.physics.upper - AGENT_RADIUS)
+        if self.terrain is not None:
+            # Newborns that would land in terrain stay on their parent
+            stuck = self.physics.blocked(agents.positions[children], AGENT_RADIUS)
+            agents.positions[children[stuck]] = agents.positions[parents[stuck]]
+        for traits in (agents.skins, agents.strategies, agents.vision_radius, agents.acceleration, agents.species):
+            traits[children] = traits[parents]
+
+    def step(self, dt=SIM_DT):
+        """
+        Advance the world by one tick.
+
+        Agent kinematics are expressed per tick, as they were in the
+        frame-locked sprite update; dt only advances the clock.  Use
+        FixedStepper to drive a world from a variable frame rate.
+        """
+        self.grown = []
+        self.born = []
+        self.died = []
+        self.caught = []
+        if self.done:
+            self.eaten = []
+            return
+
+        agents = self.agents
+        profiler = self.profiler
+        profiler.frame = self.tick
+
+        with profiler.phase("physics"):
+            self.physics.step(agents.positions, agents.velocities)
+
+        with profiler.phase("targets"):
+            # Check if someone else has beat an agent to its target
+            self.clear_lost_targets()
+            self.choose_targets(np.flatnonzero(agents.alive & ~agents.has_target & (agents.species == HERBIVORE)))
+
+        if self.prey_grid is not None:
+            with profiler.phase("hunting"):
+                self.hunt()
+
+        with profiler.phase("steer"):
+            self.steer()
+            agents.counters = (agents.counters + 1) % WANDER_PERIOD
+
+        with profiler.phase("collision"):
+            self.eat()
+            if self.prey_grid is not None:
+                self.capture()
+                self.died.extend(self.caught)
+
+        if self.food_field is not None:
+            with profiler.phase("regrowth"):
+                self.regrow()
+
+        if self.config.lifecycle:
+            with profiler.phase("lifecycle"):
+                self.live()
+
+        self.time += dt
+        self.tick += 1
+
+    def run(self, max_ticks=None, dt=SIM_DT):
+        """
+        Step until all the food is eaten or max_ticks is reached, which
+        defaults to the config's.
+        """
+        if max_ticks is None:
+            max_ticks = self.config.max_ticks
+        while not self.done and (max_ticks is None or self.tick < max_ticks):
+            self.step(dt)
+        return self.score, self.time
+
+
+class FixedStepper():
+    """
+    Runs a world at a fixed tick rate from variable frame times.
+
+    Frame time is banked in an accumulator and spent in whole ticks, so the
+    outcome of a run does not depend on the render rate.  At most max_steps
+    ticks run per frame; time beyond that is dropped so a stalled frame
+    cannot snowball into ever longer catch-up frames.
+    """
+    def __init__(self, world, dt=SIM_DT, max_steps=MAX_CATCH_UP):
+        self.world = world
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        # Ids of the food eaten and slots of the agents born during the
+        # last advance
+        self.eaten = []
+        self.born = []
+
+    def advance(self, elapsed):
+        """
+        Spend elapsed seconds of frame time; returns the ticks run.
+        """
+        self.accumulator += elapsed
+        self.eaten = []
+        self.born = []
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            self.world.step(self.dt)
+            self.eaten.extend(self.world.eaten)
+            self.born.extend(self.world.born)
+            self.accumulator -= self.dt
+            steps += 1
+        if steps == self.max_steps:
+            self.accumulator = min(self.accumulator, self.dt)
+        return steps